@@ -0,0 +1,115 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class TranslationBatcher:
+    """Coalesces translations that arrive within a few milliseconds into one upstream request
+
+    Jobs are grouped by (target language, source language), a group is sent when it is full,
+    would go over the character limit, or has waited max_wait seconds"""
+
+    def __init__(
+        self,
+        send_batch: Callable[[list[str], str, str], Awaitable[list[tuple[str, str]]]],
+        max_size: int,
+        max_wait: float,
+        max_chars: int,
+    ):
+        self.send_batch = send_batch
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_chars = max_chars
+
+        # (target_lang, source_lang) -> pending (text, future) jobs
+        self._pending: dict[tuple[str, str], list[tuple[str, asyncio.Future]]] = {}
+        self._timers: dict[tuple[str, str], asyncio.TimerHandle] = {}
+        # Batches being sent, the loop only keeps weak references to tasks
+        self._tasks: set[asyncio.Task] = set()
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.flush_reasons = {"full": 0, "chars": 0, "timeout": 0}
+
+    async def submit(self, text: str, target_lang: str, source_lang: str) -> tuple[str, str]:
+        """Queue a translation and wait for the batch it ends up in"""
+        loop = asyncio.get_running_loop()
+        key = (target_lang, source_lang)
+        future = loop.create_future()
+
+        # Adding this text would make the request too big, send what we have first
+        pending = self._pending.get(key)
+        if pending and sum(len(t) for t, _ in pending) + len(text) > self.max_chars:
+            self._flush(key, "chars")
+
+        pending = self._pending.setdefault(key, [])
+        pending.append((text, future))
+
+        if len(pending) >= self.max_size:
+            self._flush(key, "full")
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key, "timeout")
+
+        return await future
+
+    def stats(self) -> dict:
+        """Returns batch metrics, the fill ratio is how full batches are on average"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "fill_ratio": self.items / (self.batches * self.max_size) if self.batches else 0.0,
+            **{f"flush_{reason}": count for reason, count in self.flush_reasons.items()},
+        }
+
+    async def close(self) -> None:
+        """Cancel the batches that are waiting or being sent, their callers get CancelledError"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for jobs in self._pending.values():
+            for _, future in jobs:
+                future.cancel()
+        self._pending.clear()
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _flush(self, key: tuple[str, str], reason: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        jobs = self._pending.pop(key, None)
+        if not jobs:
+            return
+
+        self.batches += 1
+        self.items += len(jobs)
+        self.flush_reasons[reason] += 1
+        task = asyncio.get_running_loop().create_task(self._send(key, jobs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: tuple[str, str], jobs: list[tuple[str, asyncio.Future]]) -> None:
+        target_lang, source_lang = key
+        try:
+            results = await self.send_batch([text for text, _ in jobs], target_lang, source_lang)
+            if len(results) != len(jobs):
+                raise ValueError(f"Expected {len(jobs)} translations, got {len(results)}")
+        except asyncio.CancelledError:
+            for _, future in jobs:
+                future.cancel()
+            raise
+        except Exception as e:
+            # Every caller in the batch gets the error
+            for _, future in jobs:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Split the results back out to the waiting callers
+        for (_, future), result in zip(jobs, results):
+            if not future.done():
+                future.set_result(result)
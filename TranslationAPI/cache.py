@@ -0,0 +1,153 @@
+from collections import OrderedDict
+import datetime
+import time
+
+from bot import settings
+from i_logger.logger import log
+from metrics.instruments import MONGO_SECONDS
+
+
+def normalize(text: str) -> str:
+    """Normalize a message so small whitespace differences share one cache entry"""
+    return " ".join(text.split())
+
+
+class TranslationCache:
+    """A two-tier cache of translation results
+
+    The first tier is a bounded in-memory LRU with a TTL,
+    the optional second tier is a mongo collection shared between restarts"""
+
+    def __init__(self, max_size: int, ttl: float, collection=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.collection = collection
+        # key -> (expires_at, translated, detected)
+        self._entries: OrderedDict[tuple, tuple[float, str, str]] = OrderedDict()
+        self._index_ready = False
+
+        # Counters so we can see how much the cache saves
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, target_lang: str, source_lang: str) -> tuple:
+        return normalize(text), source_lang, target_lang
+
+    def cacheable(self, text: str) -> bool:
+        """Only short messages are worth caching, long ones are rarely repeated"""
+        if self.max_size <= 0:
+            # The cache is disabled
+            return False
+        return 0 < len(text) <= settings.TRANSLATION_CACHE_MAX_LENGTH
+
+    async def get(self, text: str, target_lang: str, source_lang: str):
+        """Returns (translated, detected) if cached, otherwise None"""
+        if not self.cacheable(text):
+            return None
+
+        key = self.key(text, target_lang, source_lang)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, translated, detected = entry
+            if expires_at > time.monotonic():
+                # Mark the entry as most recently used
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return translated, detected
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                with MONGO_SECONDS.time(operation="translation_cache_get"):
+                    document = await self.collection.find_one({"_id": self._document_id(key)})
+            except Exception as e:
+                log(f"Error reading the persistent translation cache: {e}", "critical")
+                document = None
+            if document:
+                self.persistent_hits += 1
+                # Promote the entry into the in-memory tier
+                self._store(key, document["translated"], document["detected"])
+                return document["translated"], document["detected"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, text: str, target_lang: str, source_lang: str, translated: str, detected: str) -> None:
+        """Store a translation result in both tiers"""
+        if not self.cacheable(text):
+            return
+
+        key = self.key(text, target_lang, source_lang)
+        self._store(key, translated, detected)
+
+        if self.collection is not None:
+            try:
+                await self._ensure_index()
+                with MONGO_SECONDS.time(operation="translation_cache_set"):
+                    await self.collection.update_one(
+                        {"_id": self._document_id(key)},
+                        {
+                            "$set": {
+                                "translated": translated,
+                                "detected": detected,
+                                "created_at": datetime.datetime.now(datetime.timezone.utc),
+                            }
+                        },
+                        upsert=True,
+                    )
+            except Exception as e:
+                log(f"Error writing the persistent translation cache: {e}", "critical")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters of the cache"""
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, key: tuple, translated: str, detected: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, translated, detected)
+        self._entries.move_to_end(key)
+        # Evict the least recently used entries when over the size limit
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _document_id(key: tuple) -> str:
+        text, source_lang, target_lang = key
+        return f"{source_lang}|{target_lang}|{text}"
+
+    async def _ensure_index(self) -> None:
+        """Let mongo expire persistent entries with the same TTL as the memory tier"""
+        if self._index_ready:
+            return
+        with MONGO_SECONDS.time(operation="create_translation_cache_index"):
+            await self.collection.create_index(
+                "created_at", expireAfterSeconds=int(self.ttl)
+            )
+        self._index_ready = True
+
+
+def _persistent_collection():
+    if not settings.TRANSLATION_CACHE_PERSISTENT:
+        return None
+    from db.database import get_translation_collection
+
+    return get_translation_collection()
+
+
+# The cache used by the whole bot
+translation_cache = TranslationCache(
+    settings.TRANSLATION_CACHE_SIZE,
+    settings.TRANSLATION_CACHE_TTL,
+    _persistent_collection(),
+)
@@ -0,0 +1,54 @@
+import aiohttp
+
+from bot import settings
+from TranslationAPI.constants import _HEADERS
+
+
+class TranslationClient:
+    """A long-lived HTTP client for the translation API
+
+    One pooled aiohttp session is shared by every translation,
+    so connections are kept alive between requests instead of reconnecting every message"""
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Returns the shared session, creating it on first use (must be inside the running loop)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                # Cap the amount of open sockets to the translation API
+                limit=settings.TRANSLATE_MAX_CONNECTIONS,
+                # Keep idle sockets around so the next message can reuse them
+                keepalive_timeout=settings.TRANSLATE_KEEPALIVE,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=settings.TRANSLATE_TIMEOUT),
+            )
+        return self._session
+
+    async def get_json(self, url: str, params: dict):
+        """Send a GET request and return the decoded json body"""
+        async with self.session.get(url, params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def post_form_json(self, url: str, params: dict, data: list[tuple[str, str]]):
+        """Send a form-encoded POST request and return the decoded json body
+        data is a list of pairs, so the same field can be sent more than once"""
+        async with self.session.post(url, params=params, data=data) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def close(self) -> None:
+        """Close the shared session, should be called when the bot shuts down"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# The client used by the whole bot
+client = TranslationClient()
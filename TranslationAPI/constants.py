@@ -1,4 +1,5 @@
 _GOOGLE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+_GOOGLE_TRANSLATE_BATCH_URL = "https://translate.googleapis.com/translate_a/t"
 _HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
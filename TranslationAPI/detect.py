@@ -0,0 +1,123 @@
+import json
+from pathlib import Path
+import re
+
+from bot import settings
+
+# Languages that can be recognised from their writing system alone
+# (first code point, last code point, language code)
+_SCRIPTS = [
+    (0x3040, 0x30FF, "ja"),  # Hiragana & Katakana
+    (0xAC00, 0xD7AF, "ko"),  # Hangul syllables
+    (0x1100, 0x11FF, "ko"),  # Hangul jamo
+    (0x0370, 0x03FF, "el"),  # Greek
+    (0x0590, 0x05FF, "iw"),  # Hebrew
+    (0x0E00, 0x0E7F, "th"),  # Thai
+    (0x10A0, 0x10FF, "ka"),  # Georgian
+    (0x0530, 0x058F, "hy"),  # Armenian
+]
+
+# Cyrillic is shared by many languages, text is only trusted to be Russian when every Cyrillic letter
+# is in the Russian alphabet (Ukrainian, Kazakh, Kyrgyz... add letters of their own) and it has a common
+# Russian word, since languages such as Mongolian can be written without any of their own letters
+_RUSSIAN = set("абвгдеёжзийклмнопрстуфхцчшщъыьэюя")
+_RUSSIAN_WORDS = frozenset(
+    """и в не на я что он с как а то все она так его но да ты к у же вы за бы по только ее мне было вот
+    от меня еще нет о из ему когда даже ну ли если уже или ни быть был него до вас там потом себя ничего
+    может они тут где есть надо для мы тебя их чем была сам без будет кто этот того потому какой здесь
+    этом один мой чтобы сейчас были можно после больше через эти нас про всего них много хорошо этой
+    привет спасибо сегодня пожалуйста очень тебе это""".split()
+)
+
+_WORDS = re.compile(r"[^\W\d_]+")
+
+
+def _load_profiles() -> dict:
+    """Load the compact trigram and common word profiles shipped next to this file"""
+    path = Path(__file__).parent / "data" / "language_profiles.json"
+    with open(path, encoding="utf-8") as file:
+        raw = json.load(file)
+
+    profiles = {}
+    for lang, profile in raw.items():
+        total = len(profile["trigrams"])
+        profiles[lang] = (
+            # Trigram -> weight, the most common trigrams weigh the most
+            {gram: 1 - rank / total for rank, gram in enumerate(profile["trigrams"])},
+            frozenset(profile["words"]),
+        )
+    return profiles
+
+
+_PROFILES = _load_profiles()
+
+
+def _detect_script(letters: list[str], words: list[str]) -> str | None:
+    """Detect the language from the writing system, if it only belongs to one language"""
+    counts: dict[str, int] = {}
+    cyrillic = 0
+    for char in letters:
+        point = ord(char)
+        if 0x0400 <= point <= 0x04FF:
+            cyrillic += 1
+            continue
+        for first, last, lang in _SCRIPTS:
+            if first <= point <= last:
+                counts[lang] = counts.get(lang, 0) + 1
+                break
+
+    if cyrillic / len(letters) >= 0.8:
+        cyrillic_letters = {char for char in map(str.lower, letters) if 0x0400 <= ord(char) <= 0x04FF}
+        if cyrillic_letters <= _RUSSIAN and any(word in _RUSSIAN_WORDS for word in words):
+            return "ru"
+        return None
+
+    for lang, count in counts.items():
+        if count / len(letters) >= 0.8:
+            return lang
+    # Japanese mixes kana with kanji, any kana at all is a strong signal
+    if counts.get("ja", 0) / len(letters) >= 0.2:
+        return "ja"
+    return None
+
+
+def _score(words: list[str], trigrams: dict, common_words: frozenset) -> float:
+    """How well the words match a language profile, between 0 and 1"""
+    gram_score = 0.0
+    gram_total = 0
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            gram_score += trigrams.get(padded[i : i + 3], 0.0)
+            gram_total += 1
+
+    word_score = sum(word in common_words for word in words) / len(words)
+    return (gram_score / gram_total + word_score) / 2
+
+
+def detect_language(text: str) -> str | None:
+    """Detect the language of a message locally, without calling the translation API
+    Returns the language code only when confident, otherwise None"""
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) < settings.DETECT_MIN_LETTERS:
+        return None
+
+    words = _WORDS.findall(text.lower())
+
+    # Non-latin scripts are decided by their characters
+    if any(ord(char) > 0x024F for char in letters):
+        return _detect_script(letters, words)
+
+    scores = sorted(
+        (
+            (_score(words, trigrams, common_words), lang)
+            for lang, (trigrams, common_words) in _PROFILES.items()
+        ),
+        reverse=True,
+    )
+    (best, lang), (runner_up, _) = scores[0], scores[1]
+
+    # Only trust the result when it clearly beats every other language
+    if best < settings.DETECT_MIN_SCORE or best - runner_up < settings.DETECT_MIN_MARGIN:
+        return None
+    return lang
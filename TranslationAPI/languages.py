@@ -0,0 +1,79 @@
+# Immutable registry of every supported language, built once at import
+# All lookups by language code, name or alias go through here
+
+from types import MappingProxyType
+
+from TranslationAPI.constants import LANGUAGES, FLAGS
+
+# Flag used when a language has no flag of its own
+DEFAULT_FLAG = "🌍"
+
+# Other common ways of writing a language -> its code in LANGUAGES
+_ALIASES = {
+    # ISO codes that differ from the ones Google uses
+    "he": "iw",
+    "jv": "jw",
+    "fil": "tl",
+    "nb": "no",
+    "zh": "zh-cn",
+    "zh-hans": "zh-cn",
+    "zh-hant": "zh-tw",
+    "mni": "mni-mtei",
+    # Shorter or alternative language names
+    "chinese": "zh-cn",
+    "simplified chinese": "zh-cn",
+    "traditional chinese": "zh-tw",
+    "kurdish": "ku",
+    "kurmanji": "ku",
+    "sorani": "ckb",
+    "manipuri": "mni-mtei",
+    "meiteilon": "mni-mtei",
+    "odia": "or",
+    "oriya": "or",
+    "tagalog": "tl",
+    "burmese": "my",
+    "norwegian bokmal": "no",
+    "haitian": "ht",
+    "gaelic": "gd",
+}
+
+# code -> name
+CODE_TO_NAME = MappingProxyType(dict(LANGUAGES))
+# name -> code
+NAME_TO_CODE = MappingProxyType({name: code for code, name in LANGUAGES.items()})
+# code -> flag
+CODE_TO_FLAG = MappingProxyType(dict(FLAGS))
+
+# Every case-folded code, name and alias -> code
+_LOOKUP = MappingProxyType(
+    {
+        **{alias.casefold(): code for alias, code in _ALIASES.items()},
+        **{name.casefold(): code for name, code in NAME_TO_CODE.items()},
+        **{code.casefold(): code for code in CODE_TO_NAME},
+    }
+)
+
+
+def resolve(value: str) -> str | None:
+    """Returns the language code for a code, name or alias (any case), or None if it isn't a language"""
+    return _LOOKUP.get(value.strip().casefold())
+
+
+def is_code(code: str) -> bool:
+    return code in CODE_TO_NAME
+
+
+def display_name(code: str) -> str:
+    """Returns the capitalized name of a language, such as "English" for "en" """
+    resolved = resolve(code)
+    if resolved is None:
+        return code.upper()
+    return CODE_TO_NAME[resolved].capitalize()
+
+
+def flag(code: str) -> str:
+    """Returns the flag of a language, or the globe if it has no flag"""
+    resolved = resolve(code)
+    if resolved is None:
+        return DEFAULT_FLAG
+    return CODE_TO_FLAG.get(resolved, DEFAULT_FLAG)
@@ -0,0 +1,308 @@
+from abc import ABC, abstractmethod
+import asyncio
+import os
+import random
+import time
+
+import aiohttp
+
+from bot import settings
+from i_logger.logger import log
+from metrics.instruments import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+from TranslationAPI import languages
+from TranslationAPI.client import client
+from TranslationAPI.constants import _GOOGLE_TRANSLATE_URL, _GOOGLE_TRANSLATE_BATCH_URL
+
+
+class TranslationError(Exception):
+    """Raised when no provider could translate a message"""
+
+
+# region Providers
+
+
+class Provider(ABC):
+    """A translation backend, translates several messages at once keeping each one's detected language"""
+
+    name = "base"
+
+    @abstractmethod
+    async def translate_many(self, sources: list[str], target_lang: str, source_lang: str) -> list[tuple[str, str]]:
+        """Returns (translated text, detected language) for every source, in order"""
+
+
+class GoogleProvider(Provider):
+    """The free Google Translate endpoints"""
+
+    name = "google"
+
+    async def translate_many(self, sources: list[str], target_lang: str, source_lang: str) -> list[tuple[str, str]]:
+        if len(sources) == 1:
+            return [await self._translate_single(sources[0], target_lang, source_lang)]
+
+        params = {"client": "gtx", "sl": source_lang, "tl": target_lang}
+        # Every message is its own "q" field, so they are translated separately
+        data = await client.post_form_json(
+            _GOOGLE_TRANSLATE_BATCH_URL, params, [("q", source) for source in sources]
+        )
+
+        results = []
+        for item in data:
+            # With an automatic source language every item is [translated, detected]
+            if isinstance(item, list):
+                results.append((item[0], item[1].lower() if len(item) > 1 else source_lang))
+            else:
+                results.append((item, source_lang))
+        return results
+
+    @staticmethod
+    async def _translate_single(source: str, target_lang: str, source_lang: str) -> tuple[str, str]:
+        """Translate one message with one request"""
+        # Params for GET request
+        params = {
+            "client": "gtx",
+            "sl": source_lang,
+            "tl": target_lang,
+            "dt": "t",
+            "q": source,
+        }
+
+        # Send the GET request through the shared session
+        data = await client.get_json(_GOOGLE_TRANSLATE_URL, params)
+
+        # Get the translated text
+        translated_text = " ".join(item[0] for item in data[0] if item[0])
+        return translated_text, data[2].lower()
+
+
+class LibreTranslateProvider(Provider):
+    """A LibreTranslate server, such as a self-hosted one, used as a fallback"""
+
+    name = "libretranslate"
+
+    # Google language codes -> LibreTranslate language codes, where they differ
+    _CODES = {"iw": "he", "jw": "jv", "zh-cn": "zh", "zh-tw": "zt"}
+
+    def __init__(self, url: str, api_key: str | None = None):
+        self.url = url.rstrip("/") + "/translate"
+        self.api_key = api_key
+
+    async def translate_many(self, sources: list[str], target_lang: str, source_lang: str) -> list[tuple[str, str]]:
+        body = {
+            "q": sources,
+            "source": self._CODES.get(source_lang, source_lang),
+            "target": self._CODES.get(target_lang, target_lang),
+            "format": "text",
+        }
+        if self.api_key:
+            body["api_key"] = self.api_key
+
+        async with client.session.post(self.url, json=body) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+
+        detected = data.get("detectedLanguage") or [{}] * len(sources)
+        return [
+            (
+                translated,
+                # Convert the detected code back into the one the rest of the bot uses
+                languages.resolve(info.get("language", "")) or source_lang,
+            )
+            for translated, info in zip(data["translatedText"], detected)
+        ]
+
+
+class MockProvider(Provider):
+    """A local provider for tests and load testing, never touches the network
+    Translations are the source prefixed with the target language"""
+
+    name = "mock"
+
+    def __init__(self, latency: float = 0, error_rate: float = 0, detected_lang: str = "es"):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.detected_lang = detected_lang
+        self.calls = 0
+
+    async def translate_many(self, sources: list[str], target_lang: str, source_lang: str) -> list[tuple[str, str]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise aiohttp.ClientError("Mock provider error")
+        detected = self.detected_lang if source_lang == "auto" else source_lang
+        return [(f"[{target_lang}] {source}", detected) for source in sources]
+
+
+# endregion
+
+
+class CircuitBreaker:
+    """Stops calling a provider that keeps failing
+
+    closed: calls go through, open: calls fail fast until reset_timeout passes,
+    half_open: one trial call decides whether to close or open again"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Let one trial call through
+            self.state = "half_open"
+            return True
+        if self.state == "half_open":
+            # A trial call is already in flight
+            return False
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def cancel_trial(self) -> None:
+        """The trial call was cancelled before it finished, so the next call gets to be the trial instead"""
+        if self.state == "half_open":
+            self.state = "open"
+            self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+def _retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, throttling and server errors are worth retrying, bad requests aren't"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+def _rejected(error: Exception) -> bool:
+    """The provider answered but refused the request (4xx other than 429), so it isn't unhealthy"""
+    return isinstance(error, aiohttp.ClientResponseError) and 400 <= error.status < 500 and error.status != 429
+
+
+class ProviderChain:
+    """Tries each provider in order, with a timeout and jittered exponential retries per provider
+    A circuit breaker per provider skips it while it is unhealthy"""
+
+    def __init__(
+        self,
+        providers: list[Provider],
+        timeout: float,
+        retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        failure_threshold: int,
+        reset_timeout: float,
+    ):
+        self.providers = providers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breakers = {
+            provider.name: CircuitBreaker(failure_threshold, reset_timeout)
+            for provider in providers
+        }
+
+        # provider name -> counters
+        self.metrics = {
+            provider.name: {"requests": 0, "failures": 0, "retries": 0, "short_circuited": 0}
+            for provider in providers
+        }
+        # "provider:error" -> count
+        self.errors: dict[str, int] = {}
+
+    async def translate_many(self, sources: list[str], target_lang: str, source_lang: str) -> list[tuple[str, str]]:
+        last_error: Exception | None = None
+        for provider in self.providers:
+            breaker = self.breakers[provider.name]
+            metrics = self.metrics[provider.name]
+            if not breaker.allow():
+                # Fail fast, the provider is unhealthy
+                metrics["short_circuited"] += 1
+                continue
+
+            finished = False
+            try:
+                results = await self._with_retries(provider, sources, target_lang, source_lang)
+                finished = True
+            except Exception as e:
+                finished = True
+                if _rejected(e):
+                    # The provider is up, a request it refuses must not open its breaker
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                metrics["failures"] += 1
+                last_error = e
+                log(f"Translation provider {provider.name} failed: {e!r}", "critical")
+                continue
+            finally:
+                if not finished:
+                    # Cancelled, which says nothing about the provider, don't leave the breaker waiting on it
+                    breaker.cancel_trial()
+
+            breaker.record_success()
+            return results
+
+        raise TranslationError(f"Every translation provider failed, last error: {last_error!r}")
+
+    async def _with_retries(self, provider: Provider, sources: list[str], target_lang: str, source_lang: str):
+        metrics = self.metrics[provider.name]
+        for attempt in range(self.retries + 1):
+            metrics["requests"] += 1
+            try:
+                with UPSTREAM_SECONDS.time(provider=provider.name):
+                    return await asyncio.wait_for(
+                        provider.translate_many(sources, target_lang, source_lang), self.timeout
+                    )
+            except Exception as e:
+                error = str(getattr(e, "status", type(e).__name__))
+                key = f"{provider.name}:{error}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+                UPSTREAM_ERRORS.inc(provider=provider.name, error=error)
+                if attempt == self.retries or not _retryable(e):
+                    raise
+            # Full jitter backoff, spreads retries out so they don't hit the provider at the same moment
+            metrics["retries"] += 1
+            await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt)))
+
+    def health(self) -> dict:
+        """Returns the state and counters of every provider"""
+        return {
+            name: {
+                "state": self.breakers[name].state,
+                "consecutive_failures": self.breakers[name].failures,
+                **metrics,
+            }
+            for name, metrics in self.metrics.items()
+        }
+
+
+def build_providers() -> list[Provider]:
+    """Create the providers listed in TRANSLATION_PROVIDERS, in order"""
+    providers: list[Provider] = []
+    for name in settings.TRANSLATION_PROVIDERS:
+        if name == "google":
+            providers.append(GoogleProvider())
+        elif name == "libretranslate":
+            # Only used when a server is configured
+            url = os.getenv("LIBRETRANSLATE_URL")
+            if url:
+                providers.append(LibreTranslateProvider(url, os.getenv("LIBRETRANSLATE_API_KEY")))
+        elif name == "mock":
+            providers.append(MockProvider())
+        else:
+            log(f"Unknown translation provider {name}", "critical")
+    return providers
@@ -0,0 +1,246 @@
+import asyncio
+from collections import Counter, OrderedDict, deque
+import time
+
+
+class TranslationThrottled(Exception):
+    """Raised when a translation is over the rate limit and can't be delayed any longer"""
+
+
+class TranslationDegraded(TranslationThrottled):
+    """Raised in "degrade" mode when a guild is over its budget, the caller should skip the translation"""
+
+
+class Reservation:
+    """The budget one translation holds while it waits for the rate limiter"""
+
+    __slots__ = ("scheduler", "guild_id", "guild", "upstream", "ready")
+
+    def __init__(self, scheduler: "TranslationScheduler", guild_id: int | None):
+        self.scheduler = scheduler
+        self.guild_id = guild_id or 0
+        # Whether a token was taken from the guild's and from the global budget
+        self.guild = False
+        self.upstream = False
+        # Done once the translation may go on, None when it doesn't have to wait
+        self.ready: asyncio.Future | None = None
+
+    def release(self) -> None:
+        """Give back the budget of a translation that won't be sent after all"""
+        self.scheduler.release(self)
+
+
+class TranslationDelayed(Exception):
+    """Raised instead of waiting for the rate limiter when the caller asked not to wait
+    Translate again with this reservation once reservation.ready is done"""
+
+    def __init__(self, reservation: Reservation):
+        super().__init__(f"Translation for guild {reservation.guild_id} is waiting for the rate limiter")
+        self.reservation = reservation
+
+
+class TokenBucket:
+    """Classic token bucket, refills rate tokens per second up to capacity
+    Tokens can be reserved ahead of time, which lets the bucket go negative"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> bool:
+        """Take a token if one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def reserve(self, max_wait: float) -> float | None:
+        """Take a token now, even if it only becomes available later
+        Returns the seconds to wait before using it, or None (taking nothing) if that is longer than max_wait
+        Every reservation pushes the next one further back, so concurrent waiters each get their own token"""
+        wait = self.wait_time()
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    def refund(self) -> None:
+        """Give back a token that was taken but not used"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class TranslationScheduler:
+    """Rate limits upstream translations with a global budget and a budget per guild
+
+    Every translation takes a token from its guild's budget. Only translations that are really sent
+    upstream also take one from the global budget, and they queue for it per guild: guilds are served
+    round-robin, so one guild's backlog can't use up the global budget while other guilds wait.
+    When a guild goes over its own budget, the overflow setting decides what happens:
+    "drop" raises TranslationThrottled, "delay" waits for the guild's budget (up to max_delay),
+    "degrade" raises TranslationDegraded so the caller skips the translation.
+    A translation waits at most max_delay for the global budget before it is throttled"""
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        guild_rate: float,
+        guild_burst: float,
+        overflow: str = "delay",
+        max_delay: float = 5,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.guild_rate = guild_rate
+        self.guild_burst = guild_burst
+        self.overflow = overflow
+        self.max_delay = max_delay
+
+        self._guild_buckets: dict[int, TokenBucket] = {}
+        # guild_id -> reservations waiting for a global token, in arrival order
+        self._queues: OrderedDict[int, deque[Reservation]] = OrderedDict()
+        self._dispatcher: asyncio.Task | None = None
+
+        # Metrics
+        self.counters: Counter[str] = Counter()
+        self.throttled_guilds: Counter[int] = Counter()
+
+    def reservation(self, guild_id: int | None) -> Reservation:
+        return Reservation(self, guild_id)
+
+    def _guild_bucket(self, guild_id: int) -> TokenBucket:
+        bucket = self._guild_buckets.get(guild_id)
+        if bucket is None:
+            bucket = self._guild_buckets[guild_id] = TokenBucket(self.guild_rate, self.guild_burst)
+        return bucket
+
+    def reserve_guild(self, reservation: Reservation) -> None:
+        """Take a token from the guild's budget, sets reservation.ready if it has to wait for it
+        Raises TranslationThrottled if the guild is over its budget, or TranslationDegraded in "degrade" mode"""
+        bucket = self._guild_bucket(reservation.guild_id)
+        if self.overflow == "delay":
+            wait = bucket.reserve(self.max_delay)
+        else:
+            wait = 0.0 if bucket.take() else None
+
+        if wait is None:
+            self.throttled_guilds[reservation.guild_id] += 1
+            if self.overflow == "degrade":
+                self.counters["degraded"] += 1
+                raise TranslationDegraded(f"Guild {reservation.guild_id} is over its translation budget")
+            self.counters["dropped"] += 1
+            raise TranslationThrottled(f"Guild {reservation.guild_id} is over its translation budget")
+
+        reservation.guild = True
+        if wait > 0:
+            self.counters["delayed"] += 1
+            loop = asyncio.get_running_loop()
+            reservation.ready = loop.create_future()
+            loop.call_later(wait, _resolve, reservation.ready)
+
+    def reserve_upstream(self, reservation: Reservation) -> None:
+        """Take a token from the global budget, sets reservation.ready if it has to queue for it
+        reservation.ready fails with TranslationThrottled if no token comes within max_delay"""
+        # Fast path, nobody is queued and there is a global token
+        if not self._queues and self.global_bucket.take():
+            reservation.upstream = True
+            self.counters["allowed"] += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        reservation.ready = loop.create_future()
+        self._queues.setdefault(reservation.guild_id, deque()).append(reservation)
+        self.counters["queued"] += 1
+        timeout = loop.call_later(self.max_delay, self._expire, reservation, reservation.ready)
+        reservation.ready.add_done_callback(lambda _: timeout.cancel())
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def release(self, reservation: Reservation, guild: bool = True) -> None:
+        """Give back the global token a reservation holds, and its guild token unless guild is false"""
+        if reservation.upstream:
+            self.global_bucket.refund()
+            reservation.upstream = False
+        if guild and reservation.guild:
+            self._guild_bucket(reservation.guild_id).refund()
+            reservation.guild = False
+
+        ready, reservation.ready = reservation.ready, None
+        if ready is not None:
+            if not ready.done():
+                ready.cancel()
+            elif not ready.cancelled():
+                # Nobody will look at the result any more
+                ready.exception()
+
+    def _expire(self, reservation: Reservation, ready: asyncio.Future) -> None:
+        if ready.done():
+            return
+        self.counters["timed_out"] += 1
+        self.throttled_guilds[reservation.guild_id] += 1
+        # The guild's token wasn't used after all
+        if reservation.guild:
+            self._guild_bucket(reservation.guild_id).refund()
+            reservation.guild = False
+        ready.set_exception(TranslationThrottled("Timed out waiting for the global translation budget"))
+
+    async def _dispatch(self) -> None:
+        """Hand out global tokens to the queued reservations, one guild at a time"""
+        while self._queues:
+            wait = self.global_bucket.wait_time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            # The guild at the front gets one token and goes to the back
+            guild_id, queue = next(iter(self._queues.items()))
+            reservation = queue.popleft()
+            if queue:
+                self._queues.move_to_end(guild_id)
+            else:
+                del self._queues[guild_id]
+
+            ready = reservation.ready
+            if ready is None or ready.done():
+                # Timed out or given up on while it was queued
+                continue
+            self.global_bucket.take()
+            reservation.upstream = True
+            self.counters["allowed"] += 1
+            ready.set_result(None)
+
+    def queue_depth(self) -> int:
+        """How many translations are waiting for a global token"""
+        return sum(
+            1
+            for queue in self._queues.values()
+            for reservation in queue
+            if reservation.ready is not None and not reservation.ready.done()
+        )
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "queue_depth": self.queue_depth(),
+            "throttled_guilds": len(self.throttled_guilds),
+        }
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class SingleFlight:
+    """Makes identical concurrent calls share one in-flight result
+
+    The first caller for a key starts the work, every caller that arrives
+    before it finishes waits on the same task instead of starting its own"""
+
+    def __init__(self):
+        self._in_flight: dict[tuple, asyncio.Task] = {}
+
+        # Metrics
+        self.started = 0
+        self.shared = 0
+
+    async def run(self, key: tuple, work: Callable[[], Awaitable]):
+        task = self._in_flight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.get_running_loop().create_task(work())
+            self._in_flight[key] = task
+            # Forget the key as soon as the work is done, so later calls start fresh
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.shared += 1
+
+        # Shield the task, one caller being cancelled must not cancel it for everyone else
+        return await asyncio.shield(task)
+
+    def running(self, key: tuple) -> bool:
+        """Whether work for key is in flight, a call now would share it"""
+        return key in self._in_flight
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "shared": self.shared,
+        }
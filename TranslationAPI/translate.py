@@ -1,49 +1,130 @@
+import os
 from typing import Literal, Tuple
 
-import requests
-
+from bot import settings
 from i_logger.logger import log
+from TranslationAPI.providers import ProviderChain, TranslationError, build_providers
+from TranslationAPI.cache import translation_cache
+from TranslationAPI.batcher import TranslationBatcher
+from TranslationAPI.singleflight import SingleFlight
+from TranslationAPI.ratelimit import Reservation, TranslationDelayed, TranslationScheduler, TranslationThrottled
 
-from TranslationAPI.constants import _HEADERS, _GOOGLE_TRANSLATE_URL, LANGUAGES
+from TranslationAPI import languages
 
-def translate(source: str, target_lang: str = "en", source_lang: Literal["auto"] | str = "auto") -> Tuple[str, str]:
-    """Function to translate a given source using the Google API"""
-    # Not a valid language code
-    if target_lang not in LANGUAGES.keys():
-        # Not a valid language name
-        if target_lang not in LANGUAGES.values():
-            log("Target language {target_lang} is not a valid language", "critical")
-        else:
-            # Convert language name to language code
-            target_lang = {v: k for k, v in LANGUAGES.items()}[target_lang]
-
-    # Not a valid language code and not equal to "auto"
-    if source_lang not in LANGUAGES.keys() and source_lang != "auto":
-        # Not a valid language name
-        if source_lang not in LANGUAGES.keys():
-            log("Target language {target_lang} is not a valid language", "critical")
+async def translate(source: str, target_lang: str = "en", source_lang: Literal["auto"] | str = "auto", guild_id: int | None = None, wait: bool = True, reservation: Reservation | None = None) -> Tuple[str, str]:
+    """Function to translate a given source using the Google API
+    guild_id is used for rate limiting, raises TranslationThrottled if the guild or the bot is over its budget,
+    or TranslationDegraded (a TranslationThrottled) if the translation should be skipped
+    Without wait, raises TranslationDelayed instead of waiting for the rate limiter,
+    call again with its reservation once reservation.ready is done
+    Raises TranslationError if no provider could translate the message"""
+    # Convert a language name or alias into its code
+    resolved = languages.resolve(target_lang)
+    if resolved is None:
+        log(f"Target language {target_lang} is not a valid language", "critical")
+    else:
+        target_lang = resolved
+
+    if source_lang != "auto":
+        resolved = languages.resolve(source_lang)
+        if resolved is None:
+            log(f"Source language {source_lang} is not a valid language", "critical")
         else:
-            # Convert language name to code
-            source_lang = {v: k for k, v in LANGUAGES.items()}[source_lang]
-
-    # Params for GET request
-    params = {
-        "client": "gtx",
-        "sl": source_lang,
-        "tl": target_lang,
-        "dt": "t",
-        "q": source,
-    }
+            source_lang = resolved
+
+    # Same message to the same language was translated recently
+    cached = await translation_cache.get(source, target_lang, source_lang)
+    if cached is not None:
+        # Translated while this one waited for the rate limiter, it didn't need its budget after all
+        if reservation is not None:
+            reservation.release()
+        return cached
+
+    key = translation_cache.key(source, target_lang, source_lang)
+    if reservation is None:
+        reservation = scheduler.reservation(guild_id)
+    await _reserve(reservation, key, wait)
 
     try:
-        # Send the GET request
-        response = requests.get(_GOOGLE_TRANSLATE_URL, params=params, headers=_HEADERS)
-        response.raise_for_status()
+        # Identical translations that are already in flight share one request
+        return await single_flight.run(key, lambda: _fetch(source, target_lang, source_lang))
+    except (TranslationThrottled, TranslationError):
+        raise
+    except Exception as e:
+        log(f"Error translating a message: {e!r}", "critical")
+        raise TranslationError(str(e)) from e
+
+
+async def _reserve(reservation: Reservation, key: tuple, wait: bool) -> None:
+    """Take the rate limiter's budget for a translation
+    Every caller spends its own guild's budget, only a caller that will send the request upstream spends the global budget"""
+    while True:
+        ready = reservation.ready
+        if ready is not None:
+            if not ready.done():
+                if not wait:
+                    raise TranslationDelayed(reservation)
+                await ready
+            reservation.ready = None
+            # Raises TranslationThrottled if it waited too long
+            ready.result()
+
+        if not reservation.guild:
+            scheduler.reserve_guild(reservation)
+        elif single_flight.running(key):
+            # The same translation is already on its way upstream, it doesn't need a global token of its own
+            scheduler.release(reservation, guild=False)
+            return
+        elif not reservation.upstream:
+            scheduler.reserve_upstream(reservation)
+        else:
+            return
+
+
+async def _fetch(source: str, target_lang: str, source_lang: str) -> Tuple[str, str]:
+    """Translate a message upstream and cache the result"""
+    if settings.TRANSLATE_BATCHING:
+        # Wait for the batch this message ends up in
+        translated_text, detected = await batcher.submit(source, target_lang, source_lang)
+    else:
+        [(translated_text, detected)] = await providers.translate_many([source], target_lang, source_lang)
+
+    await translation_cache.set(source, target_lang, source_lang, translated_text, detected)
+    return translated_text, detected
+
+
+# Every configured provider, with timeouts, retries and circuit breakers
+providers = ProviderChain(
+    build_providers(),
+    timeout=settings.TRANSLATE_TIMEOUT,
+    retries=settings.TRANSLATE_RETRIES,
+    backoff_base=settings.TRANSLATE_BACKOFF_BASE,
+    backoff_max=settings.TRANSLATE_BACKOFF_MAX,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+)
+
+# Every shard process takes an equal share of the global budget
+# Guilds live on a single shard, so the per-guild budget doesn't need splitting
+_processes = int(os.getenv("SHARD_PROCESSES") or 1)
+
+# Global and per-guild budget for upstream translations
+scheduler = TranslationScheduler(
+    global_rate=settings.RATE_LIMIT_GLOBAL_RATE / _processes,
+    global_burst=max(1, settings.RATE_LIMIT_GLOBAL_BURST // _processes),
+    guild_rate=settings.RATE_LIMIT_GUILD_RATE,
+    guild_burst=settings.RATE_LIMIT_GUILD_BURST,
+    overflow=settings.RATE_LIMIT_OVERFLOW,
+    max_delay=settings.RATE_LIMIT_MAX_DELAY,
+)
 
-        # Get the translated text
-        translated_text = " ".join(item[0] for item in response.json()[0] if item[0])
+# Shares in-flight translations, works even when caching is disabled
+single_flight = SingleFlight()
 
-        return translated_text, response.json()[2].lower()
-    except:
-        # Error: Return the original source message
-        return source, source_lang
\ No newline at end of file
+# Coalesces translations that arrive at the same time into one request
+batcher = TranslationBatcher(
+    providers.translate_many,
+    max_size=settings.TRANSLATE_BATCH_SIZE,
+    max_wait=settings.TRANSLATE_BATCH_WAIT,
+    max_chars=settings.TRANSLATE_BATCH_MAX_CHARS,
+)
@@ -0,0 +1,102 @@
+# region Imports & Setup
+
+import os
+import sys
+import signal
+import subprocess
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from i_logger.logger import log
+from bot.settings import SHARD_START_DELAY, SHARD_RESTART_DELAY
+
+# endregion
+
+
+def shard_ranges(shard_count: int, processes: int) -> list[range]:
+    """Split the shards into contiguous ranges, one per process, as even as possible"""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+
+def spawn(index: int, shards: range, shard_count: int, processes: int) -> subprocess.Popen:
+    """Start a bot process that connects the given shards"""
+    env = {
+        **os.environ,
+        "SHARD_COUNT": str(shard_count),
+        "SHARD_IDS": f"{shards.start}-{shards.stop - 1}",
+        # Lets every process take its share of the global translation budget
+        "SHARD_PROCESSES": str(processes),
+        # Keeps per-process resources apart, such as the metrics port
+        "SHARD_PROCESS_INDEX": str(index),
+    }
+    log(f"Starting shards {shards.start}-{shards.stop - 1} of {shard_count}", "critical", print_to_console=True)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(project_root, "bot", "main.py")], env=env, cwd=project_root
+    )
+
+
+def main():
+    """Run SHARD_COUNT shards across SHARD_PROCESSES processes, restarting any process that crashes"""
+    shard_count = int(os.getenv("SHARD_COUNT") or 0)
+    if shard_count <= 0:
+        sys.exit("SHARD_COUNT must be set to the total number of shards")
+    ranges = shard_ranges(shard_count, int(os.getenv("SHARD_PROCESSES") or os.cpu_count() or 1))
+
+    children: dict[int, subprocess.Popen] = {}
+    stopping = False
+
+    def stop(signum, _):
+        nonlocal stopping
+        stopping = True
+        for child in children.values():
+            child.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for i, shards in enumerate(ranges):
+        if stopping:
+            break
+        children[i] = spawn(i, shards, shard_count, len(ranges))
+        # Spread out the identifies, every process connects its shards on its own
+        time.sleep(SHARD_START_DELAY)
+
+    # process index -> when it is due to be started again, so one crash doesn't hold up watching the others
+    restarts: dict[int, float] = {}
+    while (children or restarts) and not stopping:
+        time.sleep(1)
+        for i, child in list(children.items()):
+            code = child.poll()
+            if code is None:
+                continue
+            del children[i]
+            if code == 0:
+                # Closed on purpose
+                continue
+            log(f"Shard process {i} exited with code {code}, restarting in {SHARD_RESTART_DELAY}s", "critical", print_to_console=True)
+            restarts[i] = time.monotonic() + SHARD_RESTART_DELAY
+
+        for i, due in list(restarts.items()):
+            if time.monotonic() >= due and not stopping:
+                del restarts[i]
+                children[i] = spawn(i, ranges[i], shard_count, len(ranges))
+
+    for child in children.values():
+        child.wait()
+
+
+if __name__ == "__main__":
+    main()
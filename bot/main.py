@@ -3,6 +3,9 @@
 import os
 import sys
 import asyncio
+import signal
+import time
+from functools import partial
 from pathlib import Path
 import discord
 from discord.ext import commands
@@ -14,11 +17,51 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, project_root)
 
 from utils.utils import replace_mentions, format_reply
-from db.config_manager import get_guild_config, get_channel_config
+from utils.message_filter import MessageFilter, is_ignored_term
+from db.config_manager import (
+    get_guild_config,
+    get_channel_config,
+    preload_guild_configs,
+    ensure_indexes,
+    migrate_channel_configs,
+    watch_config_changes,
+)
 from i_logger.logger import log
 from TranslationAPI.translate import translate
-from bot.settings import GITHUB_REPO
-from external_api.latest_release import latest_github_version
+from TranslationAPI import translate as translate_module
+from TranslationAPI.ratelimit import Reservation, TranslationDegraded, TranslationDelayed, TranslationThrottled
+from TranslationAPI.providers import TranslationError
+from TranslationAPI.client import client as translation_client
+from bot.send_queue import SendQueue
+from bot.workers import WorkerPool, AUTO
+from bot.trace import TraceRecorder
+from bot.profiler import Profiler
+from bot.watchdog import LoopWatchdog
+from metrics.instruments import STAGE_SECONDS, MESSAGES
+from metrics.runtime import monitor_event_loop, register_bot_metrics
+from metrics.server import start_metrics_server
+from bot.settings import (
+    GITHUB_REPO,
+    CONFIG_CHANGE_STREAM,
+    STARTUP_CONCURRENCY,
+    VERSION_LOOKUP_TIMEOUT,
+    SEND_COALESCE_WINDOW,
+    SEND_CHANNEL_RATE,
+    SEND_CHANNEL_PER,
+    WORKER_COUNT,
+    WORKER_QUEUE_SIZE,
+    WORKER_SHED_THRESHOLD,
+    WORKER_EXECUTOR_THREADS,
+    TRACE_RECORD_PATH,
+    METRICS_HOST,
+    METRICS_PORT,
+    EVENT_LOOP_LAG_INTERVAL,
+    PROFILE_DIRECTORY,
+    PROFILE_TOP,
+    LOOP_WATCHDOG_THRESHOLD,
+    LOOP_WATCHDOG_INTERVAL,
+)
+from external_api.latest_release import cached_github_version
 
 # endregion
 
@@ -28,33 +71,129 @@ intents.message_content = True
 intents.members = True
 
 
-class Bot(commands.Bot):
-    def __init__(self):
-        super().__init__(intents=intents, command_prefix="!", help_command=None)
+def shard_options() -> dict:
+    """Read which shards this process connects from SHARD_COUNT and SHARD_IDS ("0-3" or "0,1,2")
+    Without them discord.py picks the recommended shard count and connects every shard"""
+    options = {}
+    if os.getenv("SHARD_COUNT"):
+        options["shard_count"] = int(os.getenv("SHARD_COUNT"))  # type: ignore
+    shard_ids = os.getenv("SHARD_IDS")
+    if shard_ids:
+        if "-" in shard_ids:
+            first, last = shard_ids.split("-")
+            options["shard_ids"] = list(range(int(first), int(last) + 1))
+        else:
+            options["shard_ids"] = [int(shard_id) for shard_id in shard_ids.split(",")]
+    return options
+
+
+class Bot(commands.AutoShardedBot):
+    def __init__(self, **options):
+        super().__init__(intents=intents, command_prefix="!", help_command=None, **options)
+        # Cheap checks that run before any database or network work
+        self.message_filter = MessageFilter(command_prefix="!")
+        # Translations are sent through a per-channel queue that merges them and stays under Discord's rate limits
+        self.send_queue = SendQueue(SEND_COALESCE_WINDOW, SEND_CHANNEL_RATE, SEND_CHANNEL_PER)
+        # Translation jobs are queued by the gateway events and run by a fixed number of workers
+        self.workers = WorkerPool(
+            WORKER_COUNT, WORKER_QUEUE_SIZE, WORKER_SHED_THRESHOLD, WORKER_EXECUTOR_THREADS
+        )
+        # Anonymized traffic recording for the load harness in tests/load
+        self.trace_recorder = TraceRecorder(TRACE_RECORD_PATH) if TRACE_RECORD_PATH else None
+        # Runtime profiling, controlled by the owner-only /profile commands or signals
+        self.profiler = Profiler(PROFILE_DIRECTORY, PROFILE_TOP)
+        self.watchdog: LoopWatchdog | None = None
+
+    async def setup_hook(self):
+        # Runs once before connecting, unlike on_ready which runs on every reconnect
+        if LOOP_WATCHDOG_THRESHOLD:
+            # Started first, so blocking calls during startup are caught too
+            self.watchdog = LoopWatchdog(self.loop, LOOP_WATCHDOG_THRESHOLD, LOOP_WATCHDOG_INTERVAL)
+            self.watchdog.start()
+
+        await ensure_indexes()
+        await migrate_channel_configs()
+        self.workers.start()
+
+        # kill -USR1 toggles a CPU profile, kill -USR2 takes a memory snapshot
+        try:
+            self.loop.add_signal_handler(signal.SIGUSR1, self.profiler.toggle_cpu)
+            self.loop.add_signal_handler(signal.SIGUSR2, self.profiler.snapshot_memory)
+        except (AttributeError, NotImplementedError):
+            # Windows has neither the signals nor signal handlers on the event loop
+            pass
+
+        register_bot_metrics(self)
+        self.loop.create_task(monitor_event_loop(EVENT_LOOP_LAG_INTERVAL))
+        if METRICS_PORT:
+            # Every shard process gets its own port
+            port = METRICS_PORT + int(os.getenv("SHARD_PROCESS_INDEX") or 0)
+            try:
+                self.metrics_server = await start_metrics_server(METRICS_HOST, port)
+                log(f"Serving metrics on http://{METRICS_HOST}:{port}/metrics", "critical")
+            except OSError as e:
+                log(f"Failed to start the metrics server: {e}", "critical")
+
+        # Other processes may change configs, the change stream keeps this process's cache coherent
+        if CONFIG_CHANGE_STREAM:
+            self.loop.create_task(watch_config_changes())
 
     async def on_ready(self):
-        log(f"Logged in as {self.user}", "critical", print_to_console=True)
+        log(f"Logged in as {self.user} with shards {sorted(self.shards)} of {self.shard_count}", "critical", print_to_console=True)
+        started = time.perf_counter()
+
+        # The version lookup is blocking, so it runs in a thread alongside the config prefetch
+        version_task = asyncio.create_task(self.fetch_version())
 
-        for guild in self.guilds:
-            for role in await guild.fetch_roles():
-                # Update any role changes
-                guild.get_role(role.id)
-            # If joined any guilds while the bot was offline, make sure to create a database entry for it
-            await get_guild_config(guild.id)
+        # If joined any guilds while the bot was offline, make sure to create a database entry for it
+        phase = time.perf_counter()
+        await self.prefetch_guild_configs()
+        log(f"Prefetched {len(self.guilds)} guild configs in {time.perf_counter() - phase:.2f}s", "critical")
 
+        phase = time.perf_counter()
+        version = await version_task
         await self.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.playing,
-                name=f"with version v{latest_github_version(GITHUB_REPO)}",
+                name=f"with version v{version}",
             )
         )
+        log(f"Set presence in {time.perf_counter() - phase:.2f}s", "critical")
 
+        # Commands are global, so only the process with the first shard syncs them
+        if self.shard_ids is not None and 0 not in self.shard_ids:
+            log(f"Startup finished in {time.perf_counter() - started:.2f}s", "critical")
+            return
+
+        phase = time.perf_counter()
         try:
             synced = await self.tree.sync()
-            log(f"Synced {len(synced)} slash commands", "critical")
+            log(f"Synced {len(synced)} slash commands in {time.perf_counter() - phase:.2f}s", "critical")
         except Exception as e:
             log(f"Failed to sync commands: {e}", "critical")
 
+        log(f"Startup finished in {time.perf_counter() - started:.2f}s", "critical")
+
+    async def prefetch_guild_configs(self):
+        """Load every guild's config into the cache, in bulk"""
+        await preload_guild_configs(
+            [guild.id for guild in self.guilds], concurrency=STARTUP_CONCURRENCY
+        )
+
+    async def fetch_version(self) -> str:
+        """Get the latest version off the event loop, giving up after VERSION_LOOKUP_TIMEOUT seconds"""
+        phase = time.perf_counter()
+        try:
+            version = await asyncio.wait_for(
+                asyncio.to_thread(cached_github_version, GITHUB_REPO),
+                timeout=VERSION_LOOKUP_TIMEOUT,
+            )
+        except Exception as e:
+            log(f"Failed to get the latest version: {e!r}", "critical")
+            version = "Unknown"
+        log(f"Version lookup took {time.perf_counter() - phase:.2f}s", "critical")
+        return version
+
     async def load_cogs(self):
         """Function to load all external commands dynamically"""
         directory = Path("commands")
@@ -71,59 +210,131 @@ class Bot(commands.Bot):
         log(f"Left guild: {guild.name} ({guild.id})")
 
     async def on_message(self, message: discord.Message):
-        channel_config = await get_channel_config(message.guild.id, message.channel.id)  # type: ignore
+        if self.trace_recorder is not None and message.author != self.user:
+            self.trace_recorder.record(message)
+
+        # Checks that don't need the config run right away, everything else is left to the workers
+        if not self.message_filter.pre_check(message, self.user.id):  # type: ignore
+            # The time the message arrived, for the message to translation latency
+            self.workers.submit(AUTO, self.process_message, message, time.monotonic())
 
-        if message.author.bot and channel_config["IGNORE_BOTS"]:
+        await self.process_commands(message)
+
+    async def process_message(self, message: discord.Message, received_at: float):
+        """Worker job, translate a message that passed the config-free checks"""
+        channel_config = await self.filter_message(message)
+        if channel_config:
+            await self.translate_message(message, channel_config, received_at)
+        else:
+            MESSAGES.inc(outcome="filtered")
+
+    async def filter_message(self, message: discord.Message) -> dict | None:
+        """Run the message through the filters that need its config, before any translation work is done
+        Returns the channel config if the message should be translated, otherwise None"""
+        with STAGE_SECONDS.time(stage="config"):
+            channel_config = await get_channel_config(message.guild.id, message.channel.id)  # type: ignore
+        if not channel_config:
+            return None
+
+        # Checks that need the config, language detection is CPU heavy so it may run in the thread pool
+        with STAGE_SECONDS.time(stage="filter"):
+            if await self.workers.offload(self.message_filter.config_check, message, channel_config):
+                return None
+        return channel_config
+
+    async def translate_message(
+        self,
+        message: discord.Message,
+        channel_config: dict,
+        received_at: float | None = None,
+        reservation: Reservation | None = None,
+    ):
+        """Translate a message that passed the filters, and send the translation
+        reservation is set when the message comes back after waiting for the rate limiter"""
+
+        formatted = replace_mentions(message, message.content)
+        try:
+            with STAGE_SECONDS.time(stage="translate"):
+                translated, detected = await translate(
+                    formatted,
+                    channel_config["TARGET_LANG"],
+                    guild_id=message.guild.id,  # type: ignore
+                    wait=False,
+                    reservation=reservation,
+                )
+        except TranslationDelayed as e:
+            # Park the message until its budget is due, so the worker can move on to other guilds
+            self.workers.defer(
+                e.reservation.ready,
+                AUTO,
+                self.translate_message,
+                message,
+                channel_config,
+                received_at,
+                e.reservation,
+                on_shed=partial(self._shed, e.reservation),
+            )
+            return
+        except TranslationDegraded:
+            # The guild is over its budget, skip translating until it has budget again
+            MESSAGES.inc(outcome="degraded")
+            return
+        except TranslationThrottled:
+            MESSAGES.inc(outcome="throttled")
+            return
+        except TranslationError:
+            # Every provider failed, the errors are counted by the provider chain
+            MESSAGES.inc(outcome="failed")
             return
 
-        if message.author.id == self.user.id:  # type: ignore
+        if not detected or detected in channel_config["IGNORE_LANGS"]:
+            MESSAGES.inc(outcome="ignored_language")
             return
 
-        if not channel_config["AUTO_TRANSLATE"]:
+        # The translation itself may be an ignored term
+        if is_ignored_term(translated, channel_config) or is_ignored_term(formatted, channel_config):
+            MESSAGES.inc(outcome="ignored_term")
             return
 
-        formatted = replace_mentions(message, message.content)
-        translated, detected = translate(formatted, channel_config["TARGET_LANG"])
-
-        if detected and detected not in channel_config["IGNORE_LANGS"]:
-
-            def contains_ignored() -> bool:
-                """A function
-                that returns true
-                if a given string is equal to an item in a list of ignored terms otherwise false
-                """
-                for ignored in channel_config["IGNORED_TERMS"]:
-                    if (
-                        ignored.lower() == translated.lower()
-                        or ignored.lower() == formatted.lower()
-                    ):
-                        return True
-                return False
-
-            if not contains_ignored():
-                if translate is None:
-                    log(f"{detected} is not a valid language to translate!", "critical")
-                else:
-                    if translated.lower() != message.content.lower() and not any(role.id in channel_config["BLACKLISTED_ROLES"] for role in message.author.roles):  # type: ignore
-                        log(f"Message sent by {message.author.display_name} translated in {message.channel.name}/{message.guild.name}", "command")  # type: ignore
-
-                        formatted_reply = format_reply(
-                            channel_config["TRANSLATE_REPLY_MESSAGE"],
-                            translated,
-                            message,
-                            detected,
-                        )
-
-                        if channel_config["REPLY"]:
-                            await message.reply(formatted_reply)
-                        else:
-                            await message.channel.send(formatted_reply)
+        # Nothing changed after translating
+        if translated.lower() == message.content.lower():
+            MESSAGES.inc(outcome="unchanged")
+            return
 
-        await self.process_commands(message)
+        log(f"Message sent by {message.author.display_name} translated in {message.channel.name}/{message.guild.name}", "command")  # type: ignore
+
+        with STAGE_SECONDS.time(stage="format"):
+            formatted_reply = format_reply(
+                channel_config["TRANSLATE_REPLY_MESSAGE"],
+                translated,
+                message,
+                detected,
+            )
+
+        MESSAGES.inc(outcome="translated")
+        self.send_queue.enqueue(message, formatted_reply, channel_config["REPLY"], received_at)
+
+    @staticmethod
+    def _shed(reservation: Reservation) -> None:
+        """A parked message was shed, give back the budget it reserved"""
+        reservation.release()
+        MESSAGES.inc(outcome="shed")
+
+    async def close(self):
+        # Close the pooled translation session alongside the gateway connection
+        await self.workers.stop()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.trace_recorder is not None:
+            await asyncio.to_thread(self.trace_recorder.close)
+        await translate_module.batcher.close()
+        await translation_client.close()
+        await super().close()
 
     async def run_bot(self, token: str):
         await self.load_cogs()
         await self.start(token)
 
 
-asyncio.run(Bot().run_bot(os.getenv("TOKEN")))  # type: ignore
+if __name__ == "__main__":
+    asyncio.run(Bot(**shard_options()).run_bot(os.getenv("TOKEN")))  # type: ignore
@@ -0,0 +1,107 @@
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import tracemalloc
+
+from i_logger.logger import log
+
+
+class Profiler:
+    """Runtime CPU and memory profiling of the running bot, costs nothing while it is off
+
+    CPU profiles use cProfile on the event loop's thread, so they cover every coroutine the bot runs.
+    Memory profiles are tracemalloc snapshots, every snapshot after the first is also diffed with the previous one.
+    Results are written to timestamped files in the profiles directory"""
+
+    def __init__(self, directory: str, top: int = 25, frames: int = 10):
+        self.directory = directory
+        self.top = top
+        # How many frames tracemalloc keeps per allocation, more is slower but shows more of the call stack
+        self.frames = frames
+        self._cpu: cProfile.Profile | None = None
+        self._snapshot: tracemalloc.Snapshot | None = None
+
+    @property
+    def cpu_running(self) -> bool:
+        return self._cpu is not None
+
+    @property
+    def memory_running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _path(self, kind: str, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        # Milliseconds too, so two snapshots in the same second don't overwrite each other
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        return os.path.join(self.directory, f"{kind}-{stamp}.{extension}")
+
+    def start_cpu(self) -> bool:
+        """Start a CPU profile, returns false if one is already running"""
+        if self._cpu is not None:
+            return False
+        self._cpu = cProfile.Profile()
+        self._cpu.enable()
+        log("Started CPU profiling", "critical")
+        return True
+
+    def stop_cpu(self) -> str | None:
+        """Stop the CPU profile and write it out, returns the summary's path, or None if none was running
+        The raw .prof file next to it can be opened with pstats or snakeviz"""
+        if self._cpu is None:
+            return None
+        profile, self._cpu = self._cpu, None
+        profile.disable()
+
+        path = self._path("cpu", "txt")
+        profile.dump_stats(path.removesuffix(".txt") + ".prof")
+        summary = io.StringIO()
+        stats = pstats.Stats(profile, stream=summary)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(summary.getvalue())
+
+        log(f"Stopped CPU profiling, written to {path}", "critical")
+        return path
+
+    def toggle_cpu(self) -> None:
+        if not self.start_cpu():
+            self.stop_cpu()
+
+    def snapshot_memory(self) -> str:
+        """Take a tracemalloc snapshot and write its top allocations, and the diff with the previous snapshot
+        The first call starts tracing, so only allocations made after it are seen. Returns the file's path"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._snapshot = None
+            log("Started memory tracing", "critical")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            # Don't count tracemalloc's own memory
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [f"Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB", "", f"Top {self.top} allocations:"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[: self.top]]
+        if self._snapshot is not None:
+            lines += ["", f"Top {self.top} changes since the previous snapshot:"]
+            lines += [str(stat) for stat in snapshot.compare_to(self._snapshot, "lineno")[: self.top]]
+        self._snapshot = snapshot
+
+        path = self._path("memory", "txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        log(f"Took a memory snapshot, written to {path}", "critical")
+        return path
+
+    def stop_memory(self) -> bool:
+        """Stop tracing memory, returns false if it wasn't tracing"""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self._snapshot = None
+        log("Stopped memory tracing", "critical")
+        return True
@@ -0,0 +1,137 @@
+import asyncio
+from collections import deque
+import time
+
+import discord
+
+from i_logger.logger import log
+from metrics.instruments import MESSAGE_LATENCY, STAGE_SECONDS
+from TranslationAPI.ratelimit import TokenBucket
+
+# The most characters in one Discord message
+MAX_MESSAGE_LENGTH = 2000
+
+
+class _Pending:
+    __slots__ = ("message", "content", "reply", "enqueued_at", "received_at")
+
+    def __init__(self, message: discord.Message, content: str, reply: bool, received_at: float | None):
+        self.message = message
+        self.content = content[:MAX_MESSAGE_LENGTH]
+        self.reply = reply
+        self.enqueued_at = time.monotonic()
+        # When the original message arrived, time.monotonic()
+        self.received_at = received_at if received_at is not None else self.enqueued_at
+
+
+class SendQueue:
+    """Outbound queue of translations, one worker per channel
+
+    A translation in a quiet channel is sent right away. While a channel is busy sending, translations
+    that arrive within window seconds of each other are merged into one message (up to 2000 characters).
+    Every channel has a local token bucket mirroring Discord's per-channel rate limit, so while a channel
+    is out of budget its translations keep merging instead of piling up in discord.py's retry loop"""
+
+    def __init__(self, window: float, rate: float, per: float):
+        self.window = window
+        self.rate = rate
+        self.per = per
+
+        self._queues: dict[int, deque[_Pending]] = {}
+        self._buckets: dict[int, TokenBucket] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+        # Metrics
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        # Seconds from enqueueing to sending, of the most recently sent translation
+        self.last_latency = 0.0
+
+    def enqueue(self, message: discord.Message, content: str, reply: bool, received_at: float | None = None) -> None:
+        """Queue a translation of message to be sent in its channel
+        received_at is when the message arrived, for the message to translation latency"""
+        channel_id = message.channel.id
+        self._queues.setdefault(channel_id, deque()).append(_Pending(message, content, reply, received_at))
+        self.enqueued += 1
+
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.get_running_loop().create_task(self._work(channel_id))
+
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "coalesced": self.enqueued - self.sent - self.failed - self.depth(),
+            "depth": self.depth(),
+            "channels": len(self._queues),
+        }
+
+    async def _work(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            # Discord allows `rate` messages every `per` seconds in a channel
+            bucket = self._buckets[channel_id] = TokenBucket(self.rate / self.per, self.rate)
+
+        busy = False
+        try:
+            while queue:
+                wait = bucket.wait_time()
+                if busy or wait > 0:
+                    # Just sent or out of budget, give the translations right behind a chance to be merged
+                    await asyncio.sleep(max(wait, self.window))
+                bucket.take()
+
+                await self._send(self._take_batch(queue))
+                busy = True
+        finally:
+            if not queue:
+                self._queues.pop(channel_id, None)
+            self._workers.pop(channel_id, None)
+            # Every bucket is full again after `per` seconds, by then a new one is the same
+            asyncio.get_running_loop().call_later(self.per, self._prune_bucket, channel_id)
+
+    def _prune_bucket(self, channel_id: int) -> None:
+        """Forget the bucket of a channel that has stayed idle"""
+        if channel_id not in self._workers:
+            self._buckets.pop(channel_id, None)
+
+    @staticmethod
+    def _take_batch(queue: deque[_Pending]) -> list[_Pending]:
+        """Take as many translations as fit in one message, all with the same reply setting"""
+        batch = [queue.popleft()]
+        length = len(batch[0].content)
+        while queue and queue[0].reply == batch[0].reply:
+            # +1 for the newline between translations
+            if length + 1 + len(queue[0].content) > MAX_MESSAGE_LENGTH:
+                break
+            length += 1 + len(queue[0].content)
+            batch.append(queue.popleft())
+        return batch
+
+    async def _send(self, batch: list[_Pending]) -> None:
+        first = batch[0]
+        content = "\n".join(pending.content for pending in batch)
+        try:
+            with STAGE_SECONDS.time(stage="send"):
+                if first.reply:
+                    # Reply to the first message of the batch, still send if it was deleted in the meantime
+                    await first.message.channel.send(
+                        content, reference=first.message.to_reference(fail_if_not_exists=False)
+                    )
+                else:
+                    await first.message.channel.send(content)
+            self.sent += 1
+            now = time.monotonic()
+            self.last_latency = now - first.enqueued_at
+            for pending in batch:
+                MESSAGE_LATENCY.observe(now - pending.received_at)
+        except discord.HTTPException as e:
+            self.failed += 1
+            log(f"Failed to send a translation in {first.message.channel.id}: {e}", "critical")
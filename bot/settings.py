@@ -10,9 +10,187 @@ DEFAULT_IGNORE_BOTS = True
 DEFAULT_IGNORED_TERMS = ["lmaoo", "wdym", "ik", "ik lol"]
 DEFAULT_REPLY = True
 DEFAULT_BLACKLISTED_ROLES = []
-DEFAULT_CHANNEL_CONFIG = {}
 DEFAULT_AUTO_TRANSLATE = True
 
 # endregion
 
+# region Translation Client Settings
+
+# Seconds before a translation request is given up on
+TRANSLATE_TIMEOUT = 5
+# Translation providers, tried in order until one succeeds
+# "google", "libretranslate" (needs LIBRETRANSLATE_URL in the env) or "mock" (for tests)
+TRANSLATION_PROVIDERS = ["google", "libretranslate"]
+# How many times a failed request is retried per provider
+TRANSLATE_RETRIES = 2
+# Base and maximum seconds of the jittered exponential backoff between retries
+TRANSLATE_BACKOFF_BASE = 0.2
+TRANSLATE_BACKOFF_MAX = 2
+# Failures in a row before a provider is skipped, and seconds before it is tried again
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
+# The most sockets that can be open to the translation API at once
+TRANSLATE_MAX_CONNECTIONS = 50
+# Seconds an idle socket is kept alive for reuse
+TRANSLATE_KEEPALIVE = 30
+
+# Send translations that arrive at the same time as one request
+TRANSLATE_BATCHING = True
+# The most messages in one batched request
+TRANSLATE_BATCH_SIZE = 16
+# Seconds a batch waits for more messages before being sent
+TRANSLATE_BATCH_WAIT = 0.02
+# The most characters in one batched request
+TRANSLATE_BATCH_MAX_CHARS = 4000
+
+# endregion
+
+# region Rate Limit Settings
+
+# Upstream translations per second for the whole bot, and how many can burst at once
+RATE_LIMIT_GLOBAL_RATE = 20
+RATE_LIMIT_GLOBAL_BURST = 40
+# Upstream translations per second for a single guild, and how many can burst at once
+RATE_LIMIT_GUILD_RATE = 2
+RATE_LIMIT_GUILD_BURST = 10
+# What happens to a guild's translations over its budget: "drop", "delay" or "degrade"
+RATE_LIMIT_OVERFLOW = "delay"
+# The longest a translation waits for the rate limiter, in seconds
+RATE_LIMIT_MAX_DELAY = 5
+
+# endregion
+
+# region Send Queue Settings
+
+# Seconds to wait for more translations in a busy channel, to send them as one message
+SEND_COALESCE_WINDOW = 0.25
+# Discord allows SEND_CHANNEL_RATE messages every SEND_CHANNEL_PER seconds in a channel
+SEND_CHANNEL_RATE = 5
+SEND_CHANNEL_PER = 5
+
+# endregion
+
+# region Worker Settings
+
+# How many translation jobs run at the same time
+WORKER_COUNT = 8
+# The most jobs waiting in the queue
+WORKER_QUEUE_SIZE = 1000
+# Auto-translations are dropped once this many jobs are waiting, the rest of the queue is kept for commands
+WORKER_SHED_THRESHOLD = 800
+# Threads used for CPU heavy work such as language detection, 0 runs it on the event loop
+WORKER_EXECUTOR_THREADS = 0
+
+# endregion
+
+# region Load Testing Settings
+
+# Record the shape of every message (no content or ids) into a gzipped trace file, empty disables it
+# Every run writes a new file named after this path, trace.gz becomes trace-<time>-<pid>.gz
+# Replay the trace with python -m tests.load.replay
+TRACE_RECORD_PATH = ""
+
+# endregion
+
+# region Translation Cache Settings
+
+# The most translations kept in memory, 0 disables the cache
+TRANSLATION_CACHE_SIZE = 10_000
+# Seconds a cached translation stays valid
+TRANSLATION_CACHE_TTL = 60 * 60 * 24
+# Messages longer than this are never cached
+TRANSLATION_CACHE_MAX_LENGTH = 200
+# Also store translations in the "translations" mongo collection
+TRANSLATION_CACHE_PERSISTENT = False
+
+# endregion
+
+# region Config Cache Settings
+
+# Watch the config collection for changes made by other bot processes
+# Only works when mongo runs as a replica set
+CONFIG_CHANGE_STREAM = False
+# The most guild configs loaded by one query when preloading
+CONFIG_PRELOAD_BATCH_SIZE = 1000
+# Seconds a cached config is trusted before it is loaded again, 0 keeps it forever
+# Set this when several bot processes share the database without a change stream
+CONFIG_CACHE_TTL = 0
+
+# endregion
+
+# region Language Detection Settings
+
+# Messages with fewer letters than this are always sent to the translation API
+DETECT_MIN_LETTERS = 10
+# The lowest profile score a language needs to be trusted
+DETECT_MIN_SCORE = 0.35
+# How far ahead the best language must be of the second best
+DETECT_MIN_MARGIN = 0.1
+
+# endregion
+
+# region Logging Settings
+
+# The most log records written before the files are flushed
+LOG_BATCH_SIZE = 256
+# Seconds the log writer waits to fill a batch
+LOG_FLUSH_INTERVAL = 0.5
+# Rotate a log file once it is bigger than this many bytes
+LOG_MAX_BYTES = 10 * 1024 * 1024
+# Rotate a log file once it has been open for this many seconds
+LOG_ROTATE_INTERVAL = 60 * 60 * 24
+# How many rotated files to keep per log type, 0 keeps none
+LOG_BACKUP_COUNT = 5
+
+# endregion
+
+# region Sharding Settings
+
+# Seconds between starting each shard process, so they don't all identify at once
+SHARD_START_DELAY = 5
+# Seconds before a crashed shard process is started again
+SHARD_RESTART_DELAY = 10
+
+# endregion
+
+# region Metrics Settings
+
+# The Prometheus endpoint listens on http://METRICS_HOST:METRICS_PORT/metrics, a port of 0 disables it
+# Shard processes use METRICS_PORT + their index
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+# Seconds between event loop lag probes
+EVENT_LOOP_LAG_INTERVAL = 0.5
+
+# endregion
+
+# region Watchdog Settings
+
+# Log the event loop's stack when it hasn't run a callback for this many seconds, 0 disables the watchdog
+LOOP_WATCHDOG_THRESHOLD = 0.5
+# Seconds between the watchdog's heartbeats
+LOOP_WATCHDOG_INTERVAL = 0.25
+
+# endregion
+
+# region Profiling Settings
+
+# Where CPU profiles and memory snapshots are written
+PROFILE_DIRECTORY = "logs/profiles"
+# How many functions or allocation sites profiles and snapshots list
+PROFILE_TOP = 25
+
+# endregion
+
+# region Startup Settings
+
+# The most config preload queries running at the same time on startup
+STARTUP_CONCURRENCY = 25
+# Seconds before the github version lookup is given up on
+VERSION_LOOKUP_TIMEOUT = 5
+# Seconds the github version is cached on disk
+VERSION_CACHE_TTL = 60 * 60
+
+# endregion
+
 GITHUB_REPO = "Mazurex/Langbot"
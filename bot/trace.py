@@ -0,0 +1,131 @@
+import datetime
+import gzip
+import hashlib
+import os
+import queue
+import threading
+import time
+from typing import Iterator, NamedTuple
+
+import discord
+
+from i_logger.logger import log
+from TranslationAPI.detect import detect_language
+
+# First line of every trace file
+TRACE_HEADER = "# langbot-trace v1"
+
+# Put on the queue to tell the writer to stop
+_STOP = object()
+
+
+class TraceEvent(NamedTuple):
+    """One anonymized message, only its shape is kept, never its content or ids"""
+
+    offset: float  # Seconds since the recording started
+    guild: str  # Salted hash of the guild id
+    channel: str  # Salted hash of the channel id
+    length: int
+    lang: str  # Locally detected language, empty if unsure
+    bot: bool
+
+
+def run_path(path: str) -> str:
+    """Every recording gets its own file, trace.gz becomes trace-<time>-<pid>.gz"""
+    stem, extension = os.path.splitext(path)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"{stem}-{stamp}-{os.getpid()}{extension}"
+
+
+class TraceRecorder:
+    """Records the shape of incoming messages into a gzipped, tab separated trace file for the load harness
+
+    The event loop only queues the message, a background thread detects its language, anonymizes it
+    and writes it out in batches of flush_every, or after flush_interval seconds without messages"""
+
+    def __init__(self, path: str, flush_every: int = 1000, flush_interval: float = 5):
+        self.path = run_path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.started = time.monotonic()
+        # A new salt per recording, hashes can't be matched across traces or back to ids
+        self._salt = os.urandom(16)
+        self._records: queue.SimpleQueue = queue.SimpleQueue()
+        self.recorded = 0
+
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            file.write(TRACE_HEADER + "\n")
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def _anonymize(self, value: int) -> str:
+        return hashlib.blake2b(str(value).encode(), key=self._salt, digest_size=4).hexdigest()
+
+    def record(self, message: discord.Message) -> None:
+        if message.guild is None:
+            return
+        self._records.put(
+            (time.monotonic() - self.started, message.guild.id, message.channel.id, message.content, message.author.bot)
+        )
+        self.recorded += 1
+
+    def close(self, timeout: float = 5) -> None:
+        """Write every queued message and stop the writer, blocks until it is done"""
+        self._records.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        lines: list[str] = []
+        while True:
+            try:
+                record = self._records.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+
+            if record is not None and record is not _STOP:
+                offset, guild_id, channel_id, content, bot = record
+                try:
+                    event = TraceEvent(
+                        offset=offset,
+                        guild=self._anonymize(guild_id),
+                        channel=self._anonymize(channel_id),
+                        length=len(content),
+                        lang=detect_language(content) or "",
+                        bot=bot,
+                    )
+                    lines.append(format_event(event))
+                except Exception as e:
+                    log(f"Failed to trace a message: {e!r}", "critical")
+
+            if lines and (record is None or record is _STOP or len(lines) >= self.flush_every):
+                try:
+                    with gzip.open(self.path, "at", encoding="utf-8") as file:
+                        file.write("".join(lines))
+                except OSError as e:
+                    log(f"Failed to write the trace: {e!r}", "critical")
+                lines.clear()
+
+            if record is _STOP:
+                return
+
+
+def format_event(event: TraceEvent) -> str:
+    return f"{event.offset * 1000:.0f}\t{event.guild}\t{event.channel}\t{event.length}\t{event.lang}\t{int(event.bot)}\n"
+
+
+def read_trace(path: str) -> Iterator[TraceEvent]:
+    """Read the events of a trace file, in order
+    Recordings that were appended to one file are played one after the other"""
+    base = 0.0
+    last = 0.0
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith(TRACE_HEADER):
+                # A new recording starts counting from 0 again, carry on from where the previous one ended
+                base = last
+                continue
+            if line.startswith("#") or not line.strip():
+                continue
+            offset, guild, channel, length, lang, bot = line.rstrip("\n").split("\t")
+            last = base + int(offset) / 1000
+            yield TraceEvent(last, guild, channel, int(length), lang, bot == "1")
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from i_logger.logger import log
+from metrics.instruments import LOOP_BLOCKS
+
+
+class LoopWatchdog(threading.Thread):
+    """Detects when the event loop stops running callbacks, and logs what the loop's thread is doing
+
+    Every interval the watchdog schedules a heartbeat on the loop and waits for it. A heartbeat that takes
+    longer than threshold seconds means something is blocking the loop, so the loop thread's stack is
+    captured right then, while the blocking call is still on it.
+    Must be created on the loop's thread"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float, interval: float):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.loop = loop
+        self.threshold = threshold
+        self.interval = interval
+        self.loop_thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self.blocks = 0
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _loop_stack(self) -> str:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return "The loop's thread has exited"
+        return "".join(traceback.format_stack(frame))
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            sent = time.monotonic()
+            heartbeat = threading.Event()
+            try:
+                self.loop.call_soon_threadsafe(heartbeat.set)
+            except RuntimeError:
+                # The loop was closed
+                return
+
+            if heartbeat.wait(self.threshold):
+                self._stopped.wait(max(0.0, self.interval - (time.monotonic() - sent)))
+                continue
+
+            # Still no heartbeat, the loop is blocked right now
+            self.blocks += 1
+            LOOP_BLOCKS.inc()
+            log(
+                f"Event loop blocked for over {time.monotonic() - sent:.2f}s, the loop's thread is at:\n{self._loop_stack()}",
+                "critical",
+            )
+            while not heartbeat.wait(self.interval):
+                if self._stopped.is_set():
+                    return
+            log(f"Event loop was blocked for {time.monotonic() - sent:.2f}s", "critical")
@@ -0,0 +1,142 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+from typing import Any, Awaitable, Callable
+
+from i_logger.logger import log
+
+# Job priorities, lower runs first
+COMMAND = 0
+AUTO = 1
+
+
+class PoolOverloaded(Exception):
+    """Raised when a job can't be queued because the queue is full"""
+
+
+class WorkerPool:
+    """Runs translation jobs on a fixed number of workers, taken off a bounded priority queue
+
+    Gateway events only queue a job, so a burst of messages can't pile up unbounded coroutines.
+    Once shed_threshold jobs are waiting, new auto-translate jobs are dropped, which leaves the
+    rest of the queue for commands. CPU heavy work can be offloaded to a thread pool with offload(),
+    and jobs that have to wait (e.g. for the rate limiter) can be parked with defer() instead of holding a worker"""
+
+    def __init__(self, workers: int, max_size: int, shed_threshold: int, executor_threads: int = 0):
+        self.workers = workers
+        self.shed_threshold = shed_threshold
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(max_size)
+        # Keeps jobs of the same priority in arrival order
+        self._sequence = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self._executor = ThreadPoolExecutor(executor_threads, "worker") if executor_threads else None
+
+        # Metrics
+        self.counters: Counter[str] = Counter()
+        self.busy = 0
+        # Jobs parked with defer(), what they wait on -> the callback that queues them
+        self._parked: dict[asyncio.Future, Callable] = {}
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Parked jobs would otherwise be queued into the stopped pool
+        for ready, put in self._parked.items():
+            ready.remove_done_callback(put)
+        self._parked.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, priority: int, func: Callable[..., Awaitable], *args) -> bool:
+        """Queue func(*args) without waiting for it, returns false if the job was shed"""
+        return self._put(priority, func, args, None)
+
+    async def run(self, priority: int, func: Callable[..., Awaitable], *args) -> Any:
+        """Queue func(*args) and wait for its result, raises PoolOverloaded if it couldn't be queued"""
+        future = asyncio.get_running_loop().create_future()
+        if not self._put(priority, func, args, future):
+            raise PoolOverloaded("The job queue is full")
+        return await future
+
+    def defer(
+        self,
+        ready: asyncio.Future,
+        priority: int,
+        func: Callable[..., Awaitable],
+        *args,
+        on_shed: Callable[[], Any] | None = None,
+    ) -> None:
+        """Queue func(*args) once ready is done, no worker is held in the meantime
+        on_shed is called if the job is shed when it comes back, e.g. to give back what it reserved"""
+
+        def put(_):
+            self._parked.pop(ready, None)
+            if not self._put(priority, func, args, None):
+                self.counters["shed_deferred"] += 1
+                if on_shed is not None:
+                    on_shed()
+
+        self._parked[ready] = put
+        ready.add_done_callback(put)
+
+    @property
+    def parked(self) -> int:
+        return len(self._parked)
+
+    async def offload(self, func: Callable, *args) -> Any:
+        """Run a CPU heavy function in the thread pool, or right away when there is no thread pool"""
+        if self._executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {**self.counters, "depth": self.depth(), "busy": self.busy, "parked": self.parked, "workers": self.workers}
+
+    def _put(self, priority: int, func: Callable[..., Awaitable], args: tuple, future: asyncio.Future | None) -> bool:
+        # Shed auto-translations early, commands only once the queue is completely full
+        if priority != COMMAND and self._queue.qsize() >= self.shed_threshold:
+            self.counters["shed"] += 1
+            return False
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), func, args, future))
+        except asyncio.QueueFull:
+            self.counters["shed"] += 1
+            return False
+        self.counters["queued"] += 1
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            _, _, func, args, future = await self._queue.get()
+            self.busy += 1
+            try:
+                result = await func(*args)
+            except asyncio.CancelledError:
+                if future is not None and not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.counters["failed"] += 1
+                if future is None:
+                    log(f"Error in a queued job: {e!r}", "critical")
+                elif not future.done():
+                    future.set_exception(e)
+            else:
+                self.counters["processed"] += 1
+                if future is not None and not future.done():
+                    future.set_result(result)
+            finally:
+                self.busy -= 1
+                self._queue.task_done()
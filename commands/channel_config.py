@@ -2,11 +2,18 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from db.config_manager import (
-    get_guild_config,
+    get_channel_overrides,
     set_channel_config,
     remove_channel_config,
 )
-from utils.utils import internal_print_log_message
+from utils.utils import (
+    internal_print_log_message,
+    parse_target_lang,
+    parse_ignore_langs,
+    parse_ignored_terms,
+    parse_blacklisted_roles,
+)
+from utils.templates import compile_template, InvalidTemplate
 
 # All customize commands here have an option value parameter
 # If no value is given, instead send an embed for what the command does
@@ -16,10 +23,17 @@ def description():
     """Embed description"""
     return """Alongside the guild-wide config, you can also create a custom config for every channel.
 The parameters for creating a channel config uses the same logic as using `/config {x}`.
-If you don't specify a value for a parameter when setting, it will just take the value from the server-wide config value.
+If you don't specify a value for a parameter when setting, it will follow the server-wide config value, even when that changes later.
 """
 
 
+def override(config: dict, key: str, formatter=str) -> str:
+    """Format a channel config value, or show that it is inherited from the guild config"""
+    if key not in config:
+        return "Inherited from the server config"
+    return f"`{formatter(config[key])}`"
+
+
 class ChannelConfigPaginator(discord.ui.View):
     """Paginated view for cycling through channel-specific configurations"""
 
@@ -45,27 +59,42 @@ class ChannelConfigPaginator(discord.ui.View):
         )
         embed.add_field(
             name="Translation Reply Message",
-            value=f"`{config.get('TRANSLATE_REPLY_MESSAGE', 'N/A')}`",
+            value=override(config, "TRANSLATE_REPLY_MESSAGE"),
             inline=False,
         )
         embed.add_field(
             name="Target Language",
-            value=f"`{config.get('TARGET_LANG', 'N/A')}`",
+            value=override(config, "TARGET_LANG"),
             inline=False,
         )
         embed.add_field(
             name="Ignored Languages",
-            value=f"`{', '.join(config.get('IGNORE_LANGS', []))}`",
+            value=override(config, "IGNORE_LANGS", lambda value: ", ".join(value) or "none"),
             inline=False,
         )
         embed.add_field(
             name="Ignore Bots",
-            value=f"`{config.get('IGNORE_BOTS', False)}`",
+            value=override(config, "IGNORE_BOTS"),
+            inline=False,
+        )
+        embed.add_field(
+            name="Ignored Terms",
+            value=override(config, "IGNORED_TERMS", lambda value: ", ".join(value) or "none"),
+            inline=False,
+        )
+        embed.add_field(
+            name="Reply",
+            value=override(config, "REPLY"),
             inline=False,
         )
         embed.add_field(
-            name="Blacklisted Terms",
-            value=f"`{', '.join(config.get('BLACKLISTED_TERMS', []))}`",
+            name="Blacklisted Roles",
+            value=override(config, "BLACKLISTED_ROLES", lambda value: ", ".join(f"<@&{role_id}>" for role_id in value) or "none"),
+            inline=False,
+        )
+        embed.add_field(
+            name="Auto Translate",
+            value=override(config, "AUTO_TRANSLATE"),
             inline=False,
         )
 
@@ -129,8 +158,7 @@ class Channel_config(commands.Cog):
     async def view(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
 
-        config = await get_guild_config(interaction.guild_id)  # type: ignore
-        channel_config = config.get("CHANNEL_CONFIG")
+        channel_config = await get_channel_overrides(interaction.guild_id)  # type: ignore
 
         if not channel_config:
             embed = discord.Embed(
@@ -162,7 +190,7 @@ class Channel_config(commands.Cog):
     )
     @app_commands.describe(reply="Should the bot reply to the untranslated message")
     @app_commands.describe(
-        blacklisted_roles="Any members with these roles will be ignored by the bot, type * to disable"
+        blacklisted_roles="Any members with these roles will be ignored by the bot, type nothing to disable"
     )
     @app_commands.describe(
         auto_translate="Should the bot automatically translate messages"
@@ -182,26 +210,72 @@ class Channel_config(commands.Cog):
     ):
         await interaction.response.defer(ephemeral=True)
 
+        if translate_reply_message is not None:
+            # Reject invalid reply messages before they are stored
+            try:
+                compile_template(translate_reply_message)
+            except InvalidTemplate as e:
+                return await interaction.followup.send(
+                    f"`{translate_reply_message}` is not a valid reply message: {e}",
+                    ephemeral=True,
+                )
+
+        # Convert the text parameters into the values stored in the config, the same way /config does
+        ignore_langs = None
+        if ignore_languages is not None:
+            is_valid, ignore_langs = parse_ignore_langs(ignore_languages)
+            if not is_valid:
+                return await interaction.followup.send(
+                    f"`{ignore_langs}` is not a valid language code or name",
+                    ephemeral=True,
+                )
+
+        if target_language is not None:
+            is_valid, target_language = parse_target_lang(target_language)
+            if not is_valid:
+                return await interaction.followup.send(
+                    f"`{target_language}` is an invalid language, use the `/supported` command to view all valid languages",
+                    ephemeral=True,
+                )
+
+        ignored_terms = None
+        if blacklisted_terms is not None:
+            ignored_terms = parse_ignored_terms(blacklisted_terms)
+
+        role_ids = None
+        if blacklisted_roles is not None:
+            is_valid, role_ids = parse_blacklisted_roles(blacklisted_roles, interaction.guild)  # type: ignore
+            if not is_valid:
+                return await interaction.followup.send(
+                    "All roles given were invalid, are they correct? Are they in this guild?",
+                    ephemeral=True,
+                )
+
         channel_config = await set_channel_config(
             interaction.guild_id,  # type: ignore
-            channel.id,  # type: ignore
-            translate_reply_message,
-            target_language,
-            ignore_languages,  # type: ignore
-            ignore_bots,  # type: ignore
-            blacklisted_terms,  # type: ignore
-            reply,  # type: ignore (python bugging like usual)
-            blacklisted_roles,  # type: ignore
-            auto_translate,
-        )  # type: ignore
+            channel.id,
+            translate_reply_message=translate_reply_message,
+            target_lang=target_language,
+            ignore_langs=ignore_langs,
+            ignore_bots=ignore_bots,
+            reply=reply,
+            blacklisted_roles=role_ids,
+            ignored_terms=ignored_terms,
+            auto_translate=auto_translate,
+        )
+
+        if not channel_config:
+            return await interaction.followup.send(
+                "There was an error setting the channel config!", ephemeral=True
+            )
 
         ignored_languages_str = "none"
-        if len(channel_config["IGNORED_LANGS"]) > 0:
+        if len(channel_config["IGNORE_LANGS"]) > 0:
             ignored_languages_str = ", ".join(channel_config["IGNORE_LANGS"])
 
         blacklisted_terms_str = "none"
-        if len(channel_config["BLACKLISTED_TERMS"]) > 0:
-            blacklisted_terms_str = ", ".join(channel_config["BLACKLISTED_TERMS"])
+        if len(channel_config["IGNORED_TERMS"]) > 0:
+            blacklisted_terms_str = ", ".join(channel_config["IGNORED_TERMS"])
 
         blacklisted_roles_str = "none"
         if len(channel_config["BLACKLISTED_ROLES"]) > 0:
@@ -217,7 +291,7 @@ class Channel_config(commands.Cog):
         Ignored Terms: `{blacklisted_terms_str}`
         Reply: `{"Yes" if channel_config["REPLY"] else "No"}`
         Blacklisted Roles: `{blacklisted_roles_str}`
-        Auto Translate: `{auto_translate}`"""
+        Auto Translate: `{"Yes" if channel_config["AUTO_TRANSLATE"] else "No"}`"""
 
         await interaction.followup.send(description, ephemeral=True)
         internal_print_log_message(interaction, "channel-config/set")
@@ -2,8 +2,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from db.config_manager import get_guild_config, update_guild_config, reset_guild_config
+from TranslationAPI.languages import display_name
+from utils.templates import InvalidTemplate
 from utils.utils import (
-    LANGUAGES,
     f_translation_reply_message,
     f_target_lang,
     f_ignore_langs,
@@ -103,7 +104,7 @@ class Config(commands.Cog):
         if len(db_config["IGNORE_LANGS"]) > 0:
             ignore_languages = ", ".join(
                 [
-                    LANGUAGES.get(ignore_lang, "").capitalize()
+                    display_name(ignore_lang)
                     for ignore_lang in db_config["IGNORE_LANGS"]
                 ]
             )
@@ -126,7 +127,7 @@ class Config(commands.Cog):
         )
         embed.add_field(
             name="Target Language",
-            value=LANGUAGES[db_config["TARGET_LANG"]].capitalize(),
+            value=display_name(db_config["TARGET_LANG"]),
             inline=False,
         )
         embed.add_field(name="Ignore Languages", value=ignore_languages, inline=False)
@@ -210,7 +211,12 @@ class Config(commands.Cog):
 
         else:
             # External function
-            value = await f_translation_reply_message(value, interaction)
+            try:
+                value = await f_translation_reply_message(value, interaction)
+            except InvalidTemplate as e:
+                return await interaction.followup.send(
+                    f"`{value}` is not a valid reply message: {e}", ephemeral=True
+                )
             await interaction.followup.send(
                 f'Successfully updated "Translate Reply Message" to `{value}`',
                 ephemeral=True,
@@ -225,7 +231,7 @@ class Config(commands.Cog):
             if value is None:
                 # Get the guilds config
                 config = await get_guild_config(interaction.guild_id)  # type: ignore
-                description = f"""Current value: `{LANGUAGES[config["TARGET_LANG"]].capitalize()}`
+                description = f"""Current value: `{display_name(config["TARGET_LANG"])}`
                 The language that untranslated text should be translated into.
                 Can either be a language code (such as `en`), or language name (such as `english`).
                 Use the `/support` command to view all supported languages."""
@@ -243,7 +249,7 @@ class Config(commands.Cog):
                 # External function
                 value = await f_target_lang(value, interaction)
                 await interaction.followup.send(
-                    f'Successfully updated "Target Language" to `{LANGUAGES[value].capitalize()}`',
+                    f'Successfully updated "Target Language" to `{display_name(value)}`',
                     ephemeral=True,
                 )
         except Exception as e:
@@ -259,7 +265,7 @@ class Config(commands.Cog):
         ignored_languages_str = "none"
         if len(config["IGNORE_LANGS"]) > 0:
             ignored_languages_str = ", ".join(
-                LANGUAGES[i].capitalize() for i in config["IGNORE_LANGS"]
+                display_name(i) for i in config["IGNORE_LANGS"]
             )
 
         if value is None:
@@ -0,0 +1,71 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.utils import internal_print_log_message
+
+
+class Profiling(commands.Cog):
+    """Owner-only commands to profile the running bot, results are written under logs/"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        # Hidden from everyone but admins, and only the bot's owner can run them
+        self.profile = app_commands.Group(
+            name="profile",
+            description="Profile the running bot (owner only)",
+            default_permissions=discord.Permissions(administrator=True),
+        )
+        self.profile.command(name="cpu-start", description="Start a CPU profile")(self.cpu_start)
+        self.profile.command(name="cpu-stop", description="Stop the CPU profile and write it to a file")(self.cpu_stop)
+        self.profile.command(
+            name="memory-snapshot", description="Take a memory snapshot, diffed with the previous one"
+        )(self.memory_snapshot)
+        self.profile.command(name="memory-stop", description="Stop tracing memory")(self.memory_stop)
+        self.profile.interaction_check = self.owner_only
+
+        # Add this parent command to the command tree
+        self.bot.tree.add_command(self.profile)
+
+    async def owner_only(self, interaction: discord.Interaction) -> bool:
+        if await self.bot.is_owner(interaction.user):
+            return True
+        await interaction.response.send_message("Only the bot's owner can use this command!", ephemeral=True)
+        return False
+
+    async def cpu_start(self, interaction: discord.Interaction):
+        if self.bot.profiler.start_cpu():
+            message = "Started CPU profiling, run `/profile cpu-stop` to write the results"
+        else:
+            message = "A CPU profile is already running"
+        await interaction.response.send_message(message, ephemeral=True)
+        internal_print_log_message(interaction, "profile/cpu-start")
+
+    async def cpu_stop(self, interaction: discord.Interaction):
+        path = self.bot.profiler.stop_cpu()
+        message = f"CPU profile written to `{path}`" if path else "No CPU profile is running"
+        await interaction.response.send_message(message, ephemeral=True)
+        internal_print_log_message(interaction, "profile/cpu-stop")
+
+    async def memory_snapshot(self, interaction: discord.Interaction):
+        started = not self.bot.profiler.memory_running
+        path = self.bot.profiler.snapshot_memory()
+        message = f"Memory snapshot written to `{path}`"
+        if started:
+            message += "\nMemory tracing just started, take another snapshot later to see what grew"
+        await interaction.response.send_message(message, ephemeral=True)
+        internal_print_log_message(interaction, "profile/memory-snapshot")
+
+    async def memory_stop(self, interaction: discord.Interaction):
+        if self.bot.profiler.stop_memory():
+            message = "Stopped memory tracing"
+        else:
+            message = "Memory isn't being traced"
+        await interaction.response.send_message(message, ephemeral=True)
+        internal_print_log_message(interaction, "profile/memory-stop")
+
+
+# Setup the commands
+async def setup(bot):
+    await bot.add_cog(Profiling(bot))
@@ -0,0 +1,89 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from metrics.instruments import (
+    MESSAGE_LATENCY,
+    STAGE_SECONDS,
+    MESSAGES,
+    UPSTREAM_SECONDS,
+    UPSTREAM_ERRORS,
+    LOOP_LAG,
+    LOOP_LAG_SECONDS,
+)
+from metrics.runtime import component_stats
+from utils.utils import internal_print_log_message
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms"
+
+
+def percentiles(histogram, **labels) -> str:
+    """p50/p95/p99 of a histogram, estimated from its buckets"""
+    return " · ".join(
+        f"p{int(q * 100)} {ms(histogram.quantile(q, **labels))}" for q in (0.5, 0.95, 0.99)
+    )
+
+
+class Stats(commands.Cog):
+    """Performance statistics of the running bot"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="stats", description="View LangBot's performance statistics")
+    @app_commands.default_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        components = component_stats(self.bot)
+        embed = discord.Embed(title="📊 LangBot Stats", color=discord.Color.blue())
+
+        # The headline, message received to translation sent
+        embed.add_field(
+            name="Translation latency",
+            value=f"{percentiles(MESSAGE_LATENCY)}\n{MESSAGE_LATENCY.count()} translations sent",
+            inline=False,
+        )
+
+        stages = [
+            f"**{stage}** {percentiles(STAGE_SECONDS, stage=stage)}"
+            for stage in ("config", "filter", "translate", "format", "send")
+            if STAGE_SECONDS.count(stage=stage)
+        ]
+        embed.add_field(name="Stages", value="\n".join(stages) or "No messages yet", inline=False)
+
+        outcomes = ", ".join(f"{key[0]} {value:.0f}" for key, value in sorted(MESSAGES.values.items()))
+        embed.add_field(name="Messages", value=outcomes or "No messages yet", inline=False)
+
+        upstream = []
+        for name, stats in components.items():
+            if name.startswith("provider_"):
+                provider = name.removeprefix("provider_")
+                upstream.append(
+                    f"**{provider}** {stats['requests']} requests, {stats['state']}, "
+                    f"{percentiles(UPSTREAM_SECONDS, provider=provider)}"
+                )
+        upstream.append(f"{UPSTREAM_ERRORS.total():.0f} errors")
+        embed.add_field(name="Upstream", value="\n".join(upstream), inline=False)
+
+        cache = components["translation_cache"]
+        embed.add_field(name="Cache", value=f"{cache['hit_ratio']:.0%} hits, {cache['size']} entries")
+        embed.add_field(
+            name="Queues",
+            value=f"workers {components['workers']['depth']} (+{components['workers']['parked']} parked), send {components['send_queue']['depth']}, "
+            f"rate limiter {components['rate_limiter']['queue_depth']}\n"
+            f"{components['workers'].get('shed', 0)} shed",
+        )
+        embed.add_field(
+            name="Event loop lag",
+            value=f"now {ms(LOOP_LAG.get())}, p99 {ms(LOOP_LAG_SECONDS.quantile(0.99))}",
+        )
+        embed.set_footer(text=f"{len(self.bot.guilds)} guilds · shards {sorted(self.bot.shards)} of {self.bot.shard_count}")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        internal_print_log_message(interaction, "stats")
+
+
+# Setup the commands
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
@@ -1,3 +1,6 @@
+import asyncio
+from functools import partial
+
 import discord
 from discord.ext import commands
 from utils.utils import valid_code, internal_print_log_message
@@ -6,7 +9,9 @@ import math
 
 # Custom made translation API
 from TranslationAPI.translate import translate
-from TranslationAPI.constants import LANGUAGES
+from TranslationAPI.ratelimit import TranslationDelayed, TranslationThrottled
+from bot.workers import COMMAND, PoolOverloaded
+from TranslationAPI.languages import CODE_TO_NAME, display_name
 
 from db.config_manager import get_guild_config, get_channel_config
 
@@ -104,16 +109,33 @@ class TranslateCmds(commands.Cog):
                 ephemeral=True,
             )
 
+        # Translating can take a while, acknowledge the interaction before Discord times it out
+        await interaction.response.defer(ephemeral=True)
+
         try:
             # Translate the text into the target language, as well as detect what language the original message was in
-            translated, lang_from = translate(text, target_lang=target)
+            # Commands are queued ahead of auto-translations
+            job = partial(translate, text, target, guild_id=interaction.guild_id, wait=False)
+            while True:
+                try:
+                    translated, lang_from = await self.bot.workers.run(COMMAND, job)
+                    break
+                except TranslationDelayed as e:
+                    # Wait for the rate limiter here rather than on a worker
+                    await asyncio.wait([e.reservation.ready])
+                    job = partial(job, reservation=e.reservation)
 
             # Create the response for the message, showing what language its translating from and to
-            response = f"**[{LANGUAGES[lang_from].capitalize()} ➜ {LANGUAGES[target].capitalize()}]**\n{translated}"
-            await interaction.response.send_message(response, ephemeral=True)
+            response = f"**[{display_name(lang_from)} ➜ {display_name(target)}]**\n{translated}"
+            await interaction.followup.send(response, ephemeral=True)
             internal_print_log_message(interaction, "translate")
+        except (TranslationThrottled, PoolOverloaded):
+            await interaction.followup.send(
+                "Too many translations right now, please try again in a few seconds!",
+                ephemeral=True,
+            )
         except Exception as e:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "There was an error with this command!", ephemeral=True
             )
             log(f"Error with translate command: {e}", "critical")
@@ -127,7 +149,7 @@ class TranslateCmds(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         # Create an instance of the paginator
-        view = LanguagePaginator(user=interaction.user, languages=LANGUAGES)  # type: ignore
+        view = LanguagePaginator(user=interaction.user, languages=CODE_TO_NAME)  # type: ignore
         # Embed for each page
         embed = view.format_page()
 
@@ -1,15 +1,82 @@
+import asyncio
+import copy
+import time
+
+from pymongo import ReturnDocument, UpdateOne
+
 from bot import settings
 
-from db.database import get_database
+from db.database import get_database, get_channel_config_collection
 from i_logger.logger import log
+from metrics.instruments import MONGO_SECONDS
 
 # Get the database information from another function
 db, config_collection = get_database()
+channel_config_collection = get_channel_config_collection()
 
+# Process-local cache of the configs, so messages don't need a database round-trip
+# guild_id -> guild config document
+_guild_cache: dict[int, dict] = {}
+# guild_id -> {channel_id -> values the channel overrides}
+_override_cache: dict[int, dict[int, dict]] = {}
+# (guild_id, channel_id) -> resolved channel config
+_channel_cache: dict[tuple[int, int], dict] = {}
+# guild_id -> when the guild's config was cached, only used when CONFIG_CACHE_TTL is set
+_loaded_at: dict[int, float] = {}
 
-def default_cfig(
-    guild_id: int | None = None, remove_channel_config: bool = False
-) -> dict:
+
+async def ensure_indexes() -> None:
+    """Create the indexes the config queries rely on, does nothing if they already exist"""
+    try:
+        # Every lookup is by guild_id, and there must only ever be one config per guild
+        with MONGO_SECONDS.time(operation="create_config_index"):
+            await config_collection.create_index("guild_id", unique=True)
+        # One override document per channel
+        with MONGO_SECONDS.time(operation="create_channel_config_index"):
+            await channel_config_collection.create_index(
+                [("guild_id", 1), ("channel_id", 1)], unique=True
+            )
+    except Exception as e:
+        log(f"Error creating the config indexes: {e}", "critical")
+
+
+def invalidate_config_cache(guild_id: int | None = None) -> None:
+    """Drop cached configs for one guild, or every guild if no guild_id is given"""
+    if guild_id is None:
+        _guild_cache.clear()
+        _override_cache.clear()
+        _channel_cache.clear()
+        _loaded_at.clear()
+        return
+
+    _guild_cache.pop(guild_id, None)
+    _override_cache.pop(guild_id, None)
+    _loaded_at.pop(guild_id, None)
+    _invalidate_channels(guild_id)
+
+
+def _cache_guild(guild_id: int, config: dict) -> None:
+    _guild_cache[guild_id] = config
+    _loaded_at[guild_id] = time.monotonic()
+
+
+def _expire(guild_id: int) -> None:
+    """Drop a guild's cached configs once they are older than CONFIG_CACHE_TTL
+    Other processes' changes are picked up this way when there is no change stream"""
+    if not settings.CONFIG_CACHE_TTL:
+        return
+    loaded_at = _loaded_at.get(guild_id)
+    if loaded_at is not None and time.monotonic() - loaded_at > settings.CONFIG_CACHE_TTL:
+        invalidate_config_cache(guild_id)
+
+
+def _invalidate_channels(guild_id: int) -> None:
+    """Drop every resolved channel config of a guild"""
+    for key in [key for key in _channel_cache if key[0] == guild_id]:
+        del _channel_cache[key]
+
+
+def default_cfig(guild_id: int | None = None) -> dict:
     """Function that returns the default config with an optional guild_id param"""
     cfig = {
         "TRANSLATE_REPLY_MESSAGE": settings.DEFAULT_REPLY_MESSAGE,
@@ -19,12 +86,11 @@ def default_cfig(
         "IGNORED_TERMS": settings.DEFAULT_IGNORED_TERMS,
         "REPLY": settings.DEFAULT_REPLY,
         "BLACKLISTED_ROLES": settings.DEFAULT_BLACKLISTED_ROLES,
-        "CHANNEL_CONFIG": settings.DEFAULT_CHANNEL_CONFIG,
         "AUTO_TRANSLATE": settings.DEFAULT_AUTO_TRANSLATE,
     }
 
-    if remove_channel_config:
-        del cfig["CHANNEL_CONFIG"]
+    # Copy the defaults so a cached config never shares lists/dicts with the settings module
+    cfig = copy.deepcopy(cfig)
 
     if guild_id:
         # Append the guild id at the start of the dict if one is given
@@ -33,28 +99,88 @@ def default_cfig(
 
 
 async def get_guild_config(guild_id: int) -> dict:
-    """Function that returns the config of the guild, or creates a default one and returns that"""
+    """Function that returns the config of the guild, or creates a default one and returns that
+    The returned config is shared with the cache, so it must not be mutated"""
+    _expire(guild_id)
+    cached = _guild_cache.get(guild_id)
+    if cached is not None:
+        return cached
+
     try:
-        # Try to find a config for that guild
-        config = await config_collection.find_one({"guild_id": guild_id})
-        if not config:
-            # If it doesn't exist, create a new one
-            config = default_cfig(guild_id)
-            # Insert the new default config into the database
-            await config_collection.insert_one(config)
-            return config
+        # Find the config for that guild, or atomically create the default one if it doesn't exist
+        # Using one upsert means two events racing for a new guild can't create duplicates
+        with MONGO_SECONDS.time(operation="get_guild_config"):
+            config = await config_collection.find_one_and_update(
+                {"guild_id": guild_id},
+                {"$setOnInsert": default_cfig()},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        _cache_guild(guild_id, config)
         return config
     except Exception as e:
         log(f"Error with getting a guilds config: {e}", "critical")
     return {}
 
 
+async def preload_guild_configs(guild_ids: list[int], concurrency: int = 1) -> None:
+    """Load the configs of many guilds into the cache with one query per batch of guilds
+    Any guild without a config gets the default one, inserted in the same batch"""
+    to_load = [guild_id for guild_id in guild_ids if guild_id not in _guild_cache]
+    batch_size = settings.CONFIG_PRELOAD_BATCH_SIZE
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(batch: list[int]):
+        async with semaphore:
+            try:
+                with MONGO_SECONDS.time(operation="preload_guild_configs"):
+                    async for config in config_collection.find({"guild_id": {"$in": batch}}):
+                        _cache_guild(config["guild_id"], config)
+
+                # Every channel override of the batch, guilds without any are cached as empty
+                overrides = {guild_id: {} for guild_id in batch}
+                with MONGO_SECONDS.time(operation="preload_channel_overrides"):
+                    async for document in channel_config_collection.find({"guild_id": {"$in": batch}}):
+                        overrides[document["guild_id"]][document["channel_id"]] = _strip_override(document)
+                _override_cache.update(overrides)
+
+                # Create the default configs of guilds that were joined while the bot was offline
+                # Upserts only insert when the config is still missing, so they can't create duplicates
+                missing = [guild_id for guild_id in batch if guild_id not in _guild_cache]
+                if missing:
+                    with MONGO_SECONDS.time(operation="preload_create_configs"):
+                        await config_collection.bulk_write(
+                            [
+                                UpdateOne(
+                                    {"guild_id": guild_id},
+                                    {"$setOnInsert": default_cfig()},
+                                    upsert=True,
+                                )
+                                for guild_id in missing
+                            ],
+                            ordered=False,
+                        )
+                    for guild_id in missing:
+                        _cache_guild(guild_id, default_cfig(guild_id))
+            except Exception as e:
+                log(f"Error preloading guild configs: {e}", "critical")
+
+    await asyncio.gather(
+        *(load(to_load[i : i + batch_size]) for i in range(0, len(to_load), batch_size))
+    )
+
+
 async def update_guild_config(guild_id: int, key: str, value) -> None:
     """Updates a specific setting for the guild"""
     try:
-        await config_collection.update_one(
-            {"guild_id": guild_id}, {"$set": {key: value}}
-        )
+        with MONGO_SECONDS.time(operation="update_guild_config"):
+            await config_collection.update_one(
+                {"guild_id": guild_id}, {"$set": {key: value}}
+            )
+        # Write-through, keep the cached config in sync with the database
+        if guild_id in _guild_cache:
+            _guild_cache[guild_id][key] = value
+        _invalidate_channels(guild_id)
     except Exception as e:
         log(f"Error when trying to update a guild config parameter: {e}", "critical")
 
@@ -62,9 +188,18 @@ async def update_guild_config(guild_id: int, key: str, value) -> None:
 async def reset_guild_config(guild_id: int) -> None:
     """Resets the guild's config to the default values"""
     try:
-        await config_collection.update_one(
-            {"guild_id": guild_id}, {"$set": default_cfig()}
-        )
+        defaults = default_cfig()
+        with MONGO_SECONDS.time(operation="reset_guild_config"):
+            await config_collection.update_one(
+                {"guild_id": guild_id}, {"$set": defaults}
+            )
+        # Resetting also removes every channel config
+        with MONGO_SECONDS.time(operation="reset_channel_configs"):
+            await channel_config_collection.delete_many({"guild_id": guild_id})
+        if guild_id in _guild_cache:
+            _guild_cache[guild_id].update(defaults)
+        _override_cache[guild_id] = {}
+        _invalidate_channels(guild_id)
     except Exception as e:
         log(f"Error when resetting a guilds config: {e}", "critical")
 
@@ -81,46 +216,33 @@ async def set_channel_config(
     ignored_terms: list | None = None,
     auto_translate: bool | None = None,
 ) -> dict:
-    """Creates/Updates a channel specfic config"""
+    """Creates/Updates a channel specfic config and returns the resolved config of the channel
+    Only the given values are stored, everything left as None is inherited from the guild config"""
     try:
-        config = await get_guild_config(guild_id)
-        channel_config = config.get("CHANNEL_CONFIG", {})
-
-        if str(channel_id) in channel_config:
-            await remove_channel_config(guild_id, channel_id)
-            channel_config = {}
-
-        if translate_reply_message is None:
-            translate_reply_message = config.get("TRANSLATE_REPLY_MESSAGE")
-        if target_lang is None:
-            target_lang = config.get("TARGET_LANG")
-        if ignore_langs is None:
-            ignore_langs = config.get("IGNORE_LANGS")
-        if ignore_bots is None:
-            ignore_bots = config.get("IGNORE_BOTS")
-        if ignored_terms is None:
-            ignored_terms = config.get("IGNORED_TERMS")
-        if reply is None:
-            reply = config.get("REPLY")
-        if blacklisted_roles is None:
-            blacklisted_roles = config.get("BLACKLISTED_ROLES")
-        if auto_translate is None:
-            auto_translate = config.get("AUTO_TRANSLATE")
-
-        new_config = {
-            "TRANSLATE_REPLY_MESSAGE": translate_reply_message,
-            "TARGET_LANG": target_lang,
-            "IGNORE_LANGS": ignore_langs,
-            "IGNORE_BOTS": ignore_bots,
-            "IGNORED_TERMS": ignored_terms,
-            "REPLY": reply,
-            "BLACKLISTED_ROLES": blacklisted_roles,
-            "AUTO_TRANSLATE": auto_translate,
+        overrides = {
+            key: value
+            for key, value in {
+                "TRANSLATE_REPLY_MESSAGE": translate_reply_message,
+                "TARGET_LANG": target_lang,
+                "IGNORE_LANGS": ignore_langs,
+                "IGNORE_BOTS": ignore_bots,
+                "IGNORED_TERMS": ignored_terms,
+                "REPLY": reply,
+                "BLACKLISTED_ROLES": blacklisted_roles,
+                "AUTO_TRANSLATE": auto_translate,
+            }.items()
+            if value is not None
         }
 
-        channel_config[str(channel_id)] = new_config
-        await update_guild_config(guild_id, "CHANNEL_CONFIG", channel_config)
-        return new_config
+        # Replace the channel's overrides, one small document per channel
+        with MONGO_SECONDS.time(operation="set_channel_config"):
+            await channel_config_collection.replace_one(
+                {"guild_id": guild_id, "channel_id": channel_id},
+                {"guild_id": guild_id, "channel_id": channel_id, **overrides},
+                upsert=True,
+            )
+        _cache_overrides(guild_id, channel_id, overrides)
+        return await get_channel_config(guild_id, channel_id)
     except Exception as e:
         log(f"Error adding/updating channel config: {e}", "critical")
     return {}
@@ -129,34 +251,120 @@ async def set_channel_config(
 async def remove_channel_config(guild_id: int, channel_id: int) -> bool:
     """Removes a channel config and returns true if successful, otherwise false"""
     try:
-        config = await get_guild_config(guild_id)
-        channel_config = config.get("CHANNEL_CONFIG", {})
-
-        if str(channel_id) in channel_config:
-            del channel_config[str(channel_id)]
-            await update_guild_config(guild_id, "CHANNEL_CONFIG", channel_config)
-            return True
-        return False
-    except:
+        with MONGO_SECONDS.time(operation="remove_channel_config"):
+            result = await channel_config_collection.delete_one(
+                {"guild_id": guild_id, "channel_id": channel_id}
+            )
+        _cache_overrides(guild_id, channel_id, None)
+        return result.deleted_count > 0
+    except Exception as e:
+        log(f"Error removing channel config: {e}", "critical")
         return False
 
 
+async def get_channel_overrides(guild_id: int) -> dict[int, dict]:
+    """Returns every channel config of a guild, channel_id -> only the values that channel overrides"""
+    cached = _override_cache.get(guild_id)
+    if cached is not None:
+        return cached
+
+    # One query loads every channel of the guild, so channels without overrides are cached too
+    overrides = {}
+    with MONGO_SECONDS.time(operation="get_channel_overrides"):
+        async for document in channel_config_collection.find({"guild_id": guild_id}):
+            overrides[document["channel_id"]] = _strip_override(document)
+    _override_cache[guild_id] = overrides
+    return overrides
+
+
+def _strip_override(document: dict) -> dict:
+    """Remove the keys of an override document that aren't config values"""
+    return {k: v for k, v in document.items() if k not in ("_id", "guild_id", "channel_id")}
+
+
+def _cache_overrides(guild_id: int, channel_id: int, overrides: dict | None) -> None:
+    """Write-through for a single channel's overrides, None removes them"""
+    cached = _override_cache.get(guild_id)
+    if cached is not None:
+        if overrides is None:
+            cached.pop(channel_id, None)
+        else:
+            cached[channel_id] = overrides
+    _channel_cache.pop((guild_id, channel_id), None)
+
+
 async def get_channel_config(guild_id: int, channel_id: int) -> dict:
-    """Returns the config for a specific channel, falling back to the guild-wide config"""
+    """Returns the config for a specific channel, the guild-wide config merged with the channel's overrides
+    The resolved config is memoized until the guild config or the channel's overrides change"""
+    _expire(guild_id)
+    cached = _channel_cache.get((guild_id, channel_id))
+    if cached is not None:
+        return cached
+
     try:
         # Get the guild-based config
         config = await get_guild_config(guild_id)
-        # Get the channel configs
-        channel_config = config.get("CHANNEL_CONFIG", {})
-
-        # Get the specific channel config
-        if str(channel_id) in channel_config:
-            return channel_config[str(channel_id)]
+        if not config:
+            return {}
+        overrides = (await get_channel_overrides(guild_id)).get(channel_id, {})
 
-        # If there is no config for that channel return the guild-based config
-        # Without the channel config item
-        config.pop("CHANNEL_CONFIG", None)
-        return config
+        resolved = {**config, **overrides}
+        _channel_cache[(guild_id, channel_id)] = resolved
+        return resolved
     except Exception as e:
         log(f"Error retrieving channel config: {e}", "critical")
         return {}
+
+
+async def migrate_channel_configs() -> None:
+    """Move channel configs stored in the guild document (CHANNEL_CONFIG) into the channel_config collection
+    The old entries were full copies of the guild config, only the values that differ are kept"""
+    try:
+        # Every document is timed on its own, the writes in between aren't part of the query
+        configs = aiter(config_collection.find({"CHANNEL_CONFIG": {"$exists": True}}))
+        while True:
+            with MONGO_SECONDS.time(operation="migrate_find_channel_configs"):
+                config = await anext(configs, None)
+            if config is None:
+                break
+            guild_id = config["guild_id"]
+            for channel_id, channel_config in (config.get("CHANNEL_CONFIG") or {}).items():
+                overrides = {
+                    key: value
+                    for key, value in channel_config.items()
+                    if config.get(key) != value
+                }
+                with MONGO_SECONDS.time(operation="migrate_channel_config"):
+                    await channel_config_collection.replace_one(
+                        {"guild_id": guild_id, "channel_id": int(channel_id)},
+                        {"guild_id": guild_id, "channel_id": int(channel_id), **overrides},
+                        upsert=True,
+                    )
+            with MONGO_SECONDS.time(operation="migrate_unset_channel_configs"):
+                await config_collection.update_one(
+                    {"guild_id": guild_id}, {"$unset": {"CHANNEL_CONFIG": ""}}
+                )
+            invalidate_config_cache(guild_id)
+    except Exception as e:
+        log(f"Error migrating channel configs: {e}", "critical")
+
+
+async def watch_config_changes() -> None:
+    """Keep the config cache coherent with changes made by other bot processes
+    Requires mongo to run as a replica set, otherwise change streams are unavailable"""
+    pipeline = [{"$match": {"ns.coll": {"$in": [config_collection.name, channel_config_collection.name]}}}]
+    try:
+        async with db.watch(pipeline, full_document="updateLookup") as stream:
+            async for change in stream:
+                document = change.get("fullDocument")
+                if not document or "guild_id" not in document:
+                    # Deletes only carry the _id, so drop everything to be safe
+                    invalidate_config_cache()
+                elif change["ns"]["coll"] == config_collection.name:
+                    # Replace the cached config with the latest version
+                    _cache_guild(document["guild_id"], document)
+                    _invalidate_channels(document["guild_id"])
+                else:
+                    _cache_overrides(document["guild_id"], document["channel_id"], _strip_override(document))
+    except Exception as e:
+        log(f"Config change stream stopped: {e}", "critical")
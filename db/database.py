@@ -10,3 +10,13 @@ def get_database():
     db = client["TranslateBot"]
     config_collection = db["config"]
     return db, config_collection
+
+
+def get_translation_collection():
+    """Function that returns the collection used as the persistent translation cache"""
+    return client["TranslateBot"]["translations"]
+
+
+def get_channel_config_collection():
+    """Function that returns the collection holding channel config overrides"""
+    return client["TranslateBot"]["channel_config"]
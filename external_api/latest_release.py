@@ -1,10 +1,22 @@
+import json
+import os
+import time
+
 import requests
 import re
 
+from bot import settings
+
+# Where the last known version is kept between restarts
+_CACHE_FILE = os.path.join(".cache", "latest_version.json")
+
 
 def latest_github_version(github_repo: str) -> str:
     """Returns the latest github version"""
-    response = requests.get(f"https://api.github.com/repos/{github_repo}/commits")
+    response = requests.get(
+        f"https://api.github.com/repos/{github_repo}/commits",
+        timeout=settings.VERSION_LOOKUP_TIMEOUT,
+    )
 
     if response.status_code == 200:
         for commit in response.json():
@@ -12,3 +24,41 @@ def latest_github_version(github_repo: str) -> str:
             if re.compile(r"^\d+\.\d+\.\d+$").match(version):
                 return version
     return "Unknown"
+
+
+def _read_cache(github_repo: str) -> tuple[str, float] | None:
+    """Returns the cached (version, time it was fetched) for the repo, if any"""
+    try:
+        with open(_CACHE_FILE, encoding="utf-8") as file:
+            cache = json.load(file)
+        if cache.get("repo") == github_repo:
+            return cache["version"], cache["fetched_at"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _write_cache(github_repo: str, version: str) -> None:
+    os.makedirs(os.path.dirname(_CACHE_FILE), exist_ok=True)
+    with open(_CACHE_FILE, "w", encoding="utf-8") as file:
+        json.dump({"repo": github_repo, "version": version, "fetched_at": time.time()}, file)
+
+
+def cached_github_version(github_repo: str) -> str:
+    """Returns the latest github version, only asking github when the on-disk cache is stale
+    Blocking, so it should be run off the event loop"""
+    cached = _read_cache(github_repo)
+    if cached is not None and time.time() - cached[1] < settings.VERSION_CACHE_TTL:
+        return cached[0]
+
+    try:
+        version = latest_github_version(github_repo)
+    except requests.RequestException:
+        version = "Unknown"
+
+    if version == "Unknown":
+        # Github is unreachable or rate limited, an old version is better than nothing
+        return cached[0] if cached is not None else version
+
+    _write_cache(github_repo, version)
+    return version
@@ -1,6 +1,165 @@
 from typing import Literal
+import atexit
 import datetime
 import os
+import queue
+import threading
+import time
+
+from bot import settings
+
+# log type -> (file name, header written at the top of an empty file)
+_LOG_FILES = {
+    "generic": (
+        "generic.log",
+        "All GENERIC logs, including logs that don't fit in CRITICAL or COMMAND logs!\n\n",
+    ),
+    "critical": (
+        "critical.log",
+        "All CRITICAL errors, essentially any errors with the code!\n\n",
+    ),
+    "command": (
+        "command.log",
+        "All COMMAND logs, any command use will be logged here!\n\n",
+    ),
+}
+
+# Put on the queue to tell the writer to stop
+_STOP = object()
+
+
+class _LogWriter(threading.Thread):
+    """Background thread that writes queued log records to the log files
+
+    Files are kept open between records, written in batches and rotated by size and age"""
+
+    def __init__(self):
+        super().__init__(name="log-writer", daemon=True)
+        self.records: queue.SimpleQueue = queue.SimpleQueue()
+        # log type -> (open file, time it was opened)
+        self._files: dict[str, tuple] = {}
+
+    def run(self):
+        while True:
+            # Wait for a record, then collect more for up to LOG_FLUSH_INTERVAL seconds
+            batch = [self.records.get()]
+            deadline = time.monotonic() + settings.LOG_FLUSH_INTERVAL
+            while len(batch) < settings.LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.records.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = False
+            written = set()
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                    continue
+                log_type, created, content = record
+                try:
+                    self._write(log_type, created, content)
+                    written.add(log_type)
+                except Exception as e:
+                    # Never let a disk error (or anything else) kill the writer thread
+                    print(f"Failed to write a log: {e!r}")
+
+            for log_type in written:
+                # The file may have been dropped by a failed rotation since it was written to
+                entry = self._files.get(log_type)
+                if entry is None:
+                    continue
+                try:
+                    entry[0].flush()
+                except Exception as e:
+                    print(f"Failed to flush a log: {e!r}")
+
+            if stop:
+                self._close()
+                return
+
+    def _write(self, log_type: str, created: float, content: str) -> None:
+        # Correct date format, converting the record's time into a string
+        date_format = datetime.datetime.fromtimestamp(created).strftime("[%Y/%m/%d][%H.%M.%S]")
+        file = self._open(log_type)
+        file.write(f"{date_format} {content}\n")
+
+    def _open(self, log_type: str):
+        """Returns the open file for a log type, rotating it first if it is too big or too old"""
+        file_name, header = _LOG_FILES[log_type]
+        path = os.path.join("logs", file_name)
+
+        if log_type in self._files:
+            file, opened = self._files[log_type]
+            too_big = file.tell() >= settings.LOG_MAX_BYTES
+            too_old = time.time() - opened >= settings.LOG_ROTATE_INTERVAL
+            if not (too_big or too_old):
+                return file
+            file.close()
+            del self._files[log_type]
+            self._rotate(path)
+
+        # If the logs folder doesn't exist, create it
+        os.makedirs("logs", exist_ok=True)
+        file = open(path, "a", encoding="utf-8")
+        # Write the header message if the file is empty
+        if file.tell() == 0:
+            file.write(header)
+        self._files[log_type] = (file, time.time())
+        return file
+
+    @staticmethod
+    def _rotate(path: str) -> None:
+        """Shift old log files along (x.log.1 -> x.log.2) and move the current one to x.log.1
+        With LOG_BACKUP_COUNT at 0 no backups are kept, the current file is just started over"""
+        if os.path.getsize(path) == 0:
+            return
+        if settings.LOG_BACKUP_COUNT <= 0:
+            os.remove(path)
+            return
+        for i in range(settings.LOG_BACKUP_COUNT - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+    def _close(self) -> None:
+        for file, _ in self._files.values():
+            try:
+                file.close()
+            except Exception as e:
+                print(f"Failed to close a log: {e!r}")
+        self._files.clear()
+
+
+_writer: _LogWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _LogWriter:
+    """Start the writer thread on the first log"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _LogWriter()
+                _writer.start()
+    return _writer
+
+
+def flush_logs(timeout: float = 5) -> None:
+    """Write every queued record and stop the writer, called when the process exits"""
+    global _writer
+    if _writer is None:
+        return
+    _writer.records.put(_STOP)
+    _writer.join(timeout)
+    _writer = None
+
+
+atexit.register(flush_logs)
 
 
 def log(
@@ -8,44 +167,10 @@ def log(
     log_type: Literal["critical", "command", "generic"] = "generic",
     print_to_console: bool = False,
 ):
-    # Correct date format, converting datetime object into a string
-    date_format = datetime.datetime.now().strftime("[%Y/%m/%d][%H.%M.%S]")
-    # The layout of the log to be send
-    log_format = f"{date_format} {log_content}\n"
-
-    # Default file to open, being generic
-    file_to_open = "generic.log"
-    # Default file header message (if file is empty), being generic
-    file_header_message = "All GENERIC logs, including logs that don't fit in CRITICAL or COMMAND logs!\n\n"
-
-    # Set the correct file to open and header message based on the log type
-    if log_type == "critical":
-        file_to_open = "critical.log"
-        file_header_message = (
-            "All CRITICAL errors, essentially any errors with the code!\n\n"
-        )
-    elif log_type == "command":
-        file_to_open = "command.log"
-        file_header_message = (
-            "All COMMAND logs, any command use will be logged here!\n\n"
-        )
-
-    # If the logs folder doesn't exist, create it
-    os.makedirs("logs", exist_ok=True)
-
-    # If the file is not empty set the header message to an empty string
-    try:
-        if os.path.getsize(f"logs/{file_to_open}") > 0:
-            file_header_message = ""
-    except FileNotFoundError:
-        pass
-
     if print_to_console:
         print(log_content)
 
-    # Open the specific log file
-    with open("logs/" + file_to_open, "a", encoding="utf-8") as file:
-        # Write the header message
-        file.write(file_header_message)
-        # Write the log
-        file.write(log_format)
+    # Hand the record over to the writer thread, the caller never waits on the disk
+    _get_writer().records.put(
+        (log_type if log_type in _LOG_FILES else "generic", time.time(), log_content)
+    )
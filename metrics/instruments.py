@@ -0,0 +1,29 @@
+# Every metric the bot records, in one place so the scrape endpoint and /stats agree on names
+
+from metrics.registry import registry
+
+# The headline number, from receiving a message on the gateway to sending its translation
+MESSAGE_LATENCY = registry.histogram(
+    "langbot_message_latency_seconds", "Seconds from receiving a message to sending its translation"
+)
+# Time spent in each step of handling a message: config, filter, translate, format, send
+STAGE_SECONDS = registry.histogram("langbot_stage_seconds", "Seconds spent in each message handling stage", ("stage",))
+# What happened to every message that reached a worker
+MESSAGES = registry.counter("langbot_messages_total", "Messages handled by a worker, by outcome", ("outcome",))
+
+UPSTREAM_SECONDS = registry.histogram(
+    "langbot_upstream_seconds", "Seconds per translation provider request, including failed ones", ("provider",)
+)
+UPSTREAM_ERRORS = registry.counter(
+    "langbot_upstream_errors_total", "Failed translation provider requests, by status code or error", ("provider", "error")
+)
+
+MONGO_SECONDS = registry.histogram("langbot_mongo_seconds", "Seconds per mongo operation", ("operation",))
+
+LOOP_LAG = registry.gauge("langbot_event_loop_lag_seconds", "How late the last event loop lag probe woke up")
+LOOP_LAG_SECONDS = registry.histogram(
+    "langbot_event_loop_lag_seconds_distribution", "How late every event loop lag probe woke up"
+)
+LOOP_BLOCKS = registry.counter(
+    "langbot_event_loop_blocks_total", "Times the loop watchdog saw the event loop blocked for over its threshold"
+)
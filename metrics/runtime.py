@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from metrics.instruments import LOOP_LAG, LOOP_LAG_SECONDS
+from metrics.registry import registry
+from TranslationAPI import translate as translate_module
+from TranslationAPI.cache import translation_cache
+
+
+async def monitor_event_loop(interval: float) -> None:
+    """Measure how late a sleep wakes up, anything over zero is time the loop was busy with something else"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+        LOOP_LAG.set(lag)
+        LOOP_LAG_SECONDS.observe(lag)
+
+
+def component_stats(bot) -> dict[str, dict]:
+    """The stats() of every part of the message pipeline, by component name"""
+    stats = {
+        "message_filter": bot.message_filter.stats(),
+        "workers": bot.workers.stats(),
+        "send_queue": bot.send_queue.stats(),
+        "translation_cache": translation_cache.stats(),
+        "single_flight": translate_module.single_flight.stats(),
+        "batcher": translate_module.batcher.stats(),
+        "rate_limiter": translate_module.scheduler.stats(),
+    }
+    for provider, health in translate_module.providers.health().items():
+        stats[f"provider_{provider}"] = health
+    return stats
+
+
+def register_bot_metrics(bot) -> None:
+    """Expose the queue depths and the existing stats() counters as gauges, read on every scrape"""
+    registry.gauge(
+        "langbot_queue_depth",
+        "Items waiting in each queue",
+        ("queue",),
+        callback=lambda: {
+            ("workers",): bot.workers.depth(),
+            ("send",): bot.send_queue.depth(),
+            ("rate_limiter",): translate_module.scheduler.queue_depth(),
+        },
+    )
+    registry.gauge(
+        "langbot_component_stat",
+        "Counters reported by the parts of the message pipeline",
+        ("component", "stat"),
+        callback=lambda: {
+            (component, stat): value
+            for component, stats in component_stats(bot).items()
+            for stat, value in stats.items()
+        },
+    )
+    registry.gauge("langbot_guilds", "Guilds the process is in", callback=lambda: len(bot.guilds))
@@ -0,0 +1,255 @@
+"""Microbenchmarks of the per-message hot path, run from the project root
+
+    python -m tests.benchmarks.bench              compare against the baselines, exits 1 on a regression
+    python -m tests.benchmarks.bench --update     record the current numbers as the new baselines
+    python -m tests.benchmarks.bench -k translate only run benchmarks with "translate" in their name
+
+Discord, mongo and the translation API are replaced by the fakes in this package,
+so the numbers only measure the bot's own code (plus a localhost HTTP round trip for uncached translations)
+
+Every benchmark reports ops/sec, the bytes one op allocates (its peak, including memory freed before it returns)
+and the blocks it still holds afterwards. Allocations don't depend on the machine, their baseline is baseline.json
+and is committed, so CI catches allocation regressions. Speed does depend on the machine, so ops/sec is only
+compared against baseline.local.json, which is gitignored and every machine records for itself with --update.
+There is no committed throughput guard, record a local baseline before a change and compare after it"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, project_root)
+
+from tests.benchmarks.fakes import FakeChannel, FakeGuild, FakeMember, FakeMessage, InMemoryCollection
+from tests.benchmarks.stub_server import StubTranslateServer
+
+from bot import settings
+from db import config_manager
+from utils.utils import replace_mentions, format_reply, valid_code
+from utils.message_filter import MessageFilter
+from TranslationAPI import translate as translate_module, providers as providers_module
+from TranslationAPI.client import client as translation_client
+from TranslationAPI.ratelimit import TranslationScheduler
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+LOCAL_BASELINE_PATH = Path(__file__).with_name("baseline.local.json")
+
+# Results that are the same on every machine, the rest go in the local baseline
+ALLOCATION_METRICS = ("alloc_bytes_per_op", "retained_blocks_per_op")
+
+# Uncached translations are sent this many at a time, like a busy bot would
+TRANSLATE_CONCURRENCY = 32
+
+
+class Benchmark:
+    def __init__(self, name: str, func, ops_per_call: int = 1):
+        self.name = name
+        self.func = func
+        # How many operations one call does, so batched benchmarks report per message
+        self.ops_per_call = ops_per_call
+
+
+async def _call(func, iterations: int) -> None:
+    if inspect.iscoroutinefunction(func):
+        for _ in range(iterations):
+            await func()
+    else:
+        for _ in range(iterations):
+            func()
+
+
+def _nothing() -> None:
+    pass
+
+
+async def _allocated(func, iterations: int) -> int:
+    """Bytes allocated by iterations calls of func, tracemalloc must be tracing
+    The peak above where a call started is what it allocated, even if it was freed again before returning"""
+    is_coroutine = inspect.iscoroutinefunction(func)
+    allocated = 0
+    for _ in range(iterations):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        if is_coroutine:
+            await func()
+        else:
+            func()
+        allocated += tracemalloc.get_traced_memory()[1] - start
+    return allocated
+
+
+async def measure(benchmark: Benchmark, duration: float) -> dict:
+    """Returns ops/sec and the memory allocated per op"""
+    # Warm up caches and find how many calls fill the duration
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        await _call(benchmark.func, iterations)
+        elapsed = time.perf_counter() - started
+        if elapsed >= duration / 4:
+            break
+        iterations *= 2
+    iterations = max(1, int(iterations * duration / elapsed))
+
+    started = time.perf_counter()
+    await _call(benchmark.func, iterations)
+    elapsed = time.perf_counter() - started
+
+    # Allocations are measured in a separate run, tracemalloc slows everything down
+    alloc_iterations = max(1, min(iterations, 1000))
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(ignore)
+    # Minus what measuring a call that does nothing allocates
+    allocated = await _allocated(benchmark.func, alloc_iterations) - await _allocated(_nothing, alloc_iterations)
+    after = tracemalloc.take_snapshot().filter_traces(ignore)
+    tracemalloc.stop()
+    # What the calls still hold afterwards (caches, leaks)
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    ops = iterations * benchmark.ops_per_call
+    alloc_ops = alloc_iterations * benchmark.ops_per_call
+    return {
+        "ops_per_sec": round(ops / elapsed, 1),
+        "alloc_bytes_per_op": round(max(0, allocated) / alloc_ops, 1),
+        "retained_blocks_per_op": round(retained / alloc_ops, 3),
+    }
+
+
+def regressions(name: str, result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compare a result with its baseline, returns why it regressed"""
+    problems = []
+    if "ops_per_sec" in baseline and result["ops_per_sec"] < baseline["ops_per_sec"] * (1 - tolerance):
+        problems.append(f"{name}: {result['ops_per_sec']} ops/sec, baseline {baseline['ops_per_sec']}")
+    # Small absolute slack so allocation-free functions don't fail on noise
+    if "alloc_bytes_per_op" in baseline and result["alloc_bytes_per_op"] > baseline["alloc_bytes_per_op"] * (1 + tolerance) + 64:
+        problems.append(f"{name}: {result['alloc_bytes_per_op']} bytes/op, baseline {baseline['alloc_bytes_per_op']}")
+    if "retained_blocks_per_op" in baseline and result["retained_blocks_per_op"] > baseline["retained_blocks_per_op"] * (1 + tolerance) + 0.1:
+        problems.append(
+            f"{name}: {result['retained_blocks_per_op']} retained blocks/op, baseline {baseline['retained_blocks_per_op']}"
+        )
+    return problems
+
+
+def _read(path: Path) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _write(path: Path, baseline: dict, results: dict, metrics) -> None:
+    for name, result in results.items():
+        baseline[name] = {metric: result[metric] for metric in metrics}
+    path.write_text(json.dumps(baseline, indent=4, sort_keys=True) + "\n")
+    print(f"Baseline written to {path}")
+
+
+async def build_benchmarks(server: StubTranslateServer) -> list[Benchmark]:
+    # Configs come from an in-memory collection instead of mongo
+    config_manager.config_collection = InMemoryCollection("config")
+    config_manager.channel_config_collection = InMemoryCollection("channel_config")
+    config_manager.invalidate_config_cache()
+
+    # Translations go to the local stub, with a rate limit that never kicks in
+    providers_module._GOOGLE_TRANSLATE_URL = server.url("/translate_a/single")
+    providers_module._GOOGLE_TRANSLATE_BATCH_URL = server.url("/translate_a/t")
+    translate_module.scheduler = TranslationScheduler(1e9, 1e9, 1e9, 1e9)
+
+    guild = FakeGuild()
+    channel = FakeChannel(guild)
+    mentioned = [FakeMember(f"user{i}") for i in range(3)]
+    message = FakeMessage(
+        f"hola {mentioned[0].mention} y <@!{mentioned[1].id}>, ¿cómo estás? {mentioned[2].mention}",
+        channel=channel,
+        mentions=mentioned,
+    )
+    config = await config_manager.get_channel_config(guild.id, channel.id)
+    message_filter = MessageFilter(command_prefix="!")
+    rich_template = "{flag} {author_mention} ({lang_name}) in {channel_name}: {translated} [{message_url}]"
+
+    counter = iter(range(10**12))
+
+    async def translate_cached():
+        await translate_module.translate("hola, ¿cómo estás?", "en", guild_id=guild.id)
+
+    async def translate_uncached():
+        # Unique messages miss the cache and go through the rate limiter, batcher and stub server
+        await asyncio.gather(
+            *(
+                translate_module.translate(f"mensaje número {next(counter)}", "en", guild_id=guild.id)
+                for _ in range(TRANSLATE_CONCURRENCY)
+            )
+        )
+
+    async def get_channel_config_cached():
+        await config_manager.get_channel_config(guild.id, channel.id)
+
+    async def get_channel_config_uncached():
+        config_manager.invalidate_config_cache(guild.id)
+        await config_manager.get_channel_config(guild.id, channel.id)
+
+    return [
+        Benchmark("replace_mentions", lambda: replace_mentions(message, message.content)),
+        Benchmark("format_reply_default", lambda: format_reply(settings.DEFAULT_REPLY_MESSAGE, "hello", message, "es")),
+        Benchmark("format_reply_rich", lambda: format_reply(rich_template, "hello", message, "es")),
+        Benchmark("valid_code_code", lambda: valid_code("pl")),
+        Benchmark("valid_code_name", lambda: valid_code("Polish")),
+        Benchmark("valid_code_invalid", lambda: valid_code("klingon")),
+        Benchmark("message_filter", lambda: message_filter.pre_check(message, 0) or message_filter.config_check(message, config)),
+        Benchmark("get_channel_config_cached", get_channel_config_cached),
+        Benchmark("get_channel_config_uncached", get_channel_config_uncached),
+        Benchmark("translate_cached", translate_cached),
+        Benchmark("translate_uncached", translate_uncached, ops_per_call=TRANSLATE_CONCURRENCY),
+    ]
+
+
+async def run(args) -> int:
+    baseline = _read(BASELINE_PATH)
+    local_baseline = _read(LOCAL_BASELINE_PATH)
+    if not baseline and not args.update:
+        print(f"No baseline at {BASELINE_PATH}, record one with --update")
+        return 1
+
+    results = {}
+    problems = []
+
+    with StubTranslateServer() as server:
+        try:
+            for benchmark in await build_benchmarks(server):
+                if args.k and args.k not in benchmark.name:
+                    continue
+                result = results[benchmark.name] = await measure(benchmark, args.duration)
+                print(
+                    f"{benchmark.name:<30} {result['ops_per_sec']:>14,.1f} ops/sec"
+                    f" {result['alloc_bytes_per_op']:>10,.1f} B/op {result['retained_blocks_per_op']:>8} retained/op"
+                )
+                expected = {**local_baseline.get(benchmark.name, {}), **baseline.get(benchmark.name, {})}
+                problems += regressions(benchmark.name, result, expected, args.tolerance)
+        finally:
+            await translation_client.close()
+
+    if args.update:
+        _write(BASELINE_PATH, baseline, results, ALLOCATION_METRICS)
+        _write(LOCAL_BASELINE_PATH, local_baseline, results, ("ops_per_sec",))
+        return 0
+
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="Record the results as the new baseline")
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds each benchmark runs for")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing, 0.2 is 20%%")
+    parser.add_argument("-k", help="Only run benchmarks whose name contains this")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""In-process stand-ins for discord.py objects and the Motor collections
+Only the attributes and methods the bot uses are implemented"""
+
+import copy
+import itertools
+from types import SimpleNamespace
+
+_ids = itertools.count(100_000_000_000_000_000)
+
+
+# region Discord
+
+
+class FakeRole:
+    def __init__(self, role_id: int | None = None):
+        self.id = role_id or next(_ids)
+
+
+class FakeMember:
+    def __init__(self, name: str = "member", bot: bool = False, roles: list[FakeRole] | None = None):
+        self.id = next(_ids)
+        self.name = name
+        self.display_name = name.capitalize()
+        self.bot = bot
+        self.roles = roles or []
+        self.avatar = None
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+class FakeGuild:
+    def __init__(self, name: str = "guild"):
+        self.id = next(_ids)
+        self.name = name
+
+
+class FakeChannel:
+    def __init__(self, guild: FakeGuild, name: str = "general"):
+        self.id = next(_ids)
+        self.name = name
+        self.guild = guild
+        # Every message sent to the channel, (content, reference)
+        self.sent: list[tuple[str, object]] = []
+
+    async def send(self, content: str, reference=None, **_):
+        self.sent.append((content, reference))
+        return SimpleNamespace(id=next(_ids), content=content)
+
+
+class FakeMessage:
+    def __init__(
+        self,
+        content: str,
+        author: FakeMember | None = None,
+        channel: FakeChannel | None = None,
+        mentions: list[FakeMember] | None = None,
+    ):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author or FakeMember()
+        self.channel = channel or FakeChannel(FakeGuild())
+        self.guild = self.channel.guild
+        self.mentions = mentions or []
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild.id}/{self.channel.id}/{self.id}"
+
+    async def reply(self, content: str, **kwargs):
+        return await self.channel.send(content, reference=self, **kwargs)
+
+    def to_reference(self, fail_if_not_exists: bool = True):
+        return self
+
+
+# endregion
+
+# region Mongo
+
+
+def _matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$exists" in condition and (key in document) != condition["$exists"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Result(SimpleNamespace):
+    pass
+
+
+class _Cursor:
+    def __init__(self, documents: list[dict]):
+        self._documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._documents:
+            yield copy.deepcopy(document)
+
+
+class InMemoryCollection:
+    """A dict-backed stand-in for a Motor collection, supporting the queries the config manager sends"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: list[dict] = []
+        self.operations = 0
+
+    def _find(self, query: dict) -> list[dict]:
+        return [document for document in self.documents if _matches(document, query)]
+
+    def _insert(self, query: dict, document: dict) -> dict:
+        document = {"_id": next(_ids), **{k: v for k, v in query.items() if not isinstance(v, dict)}, **document}
+        self.documents.append(document)
+        return document
+
+    @staticmethod
+    def _apply(document: dict, update: dict) -> None:
+        document.update(copy.deepcopy(update.get("$set", {})))
+        for key in update.get("$unset", {}):
+            document.pop(key, None)
+
+    async def create_index(self, *_, **__):
+        return "index"
+
+    async def find_one(self, query: dict):
+        self.operations += 1
+        found = self._find(query)
+        return copy.deepcopy(found[0]) if found else None
+
+    def find(self, query: dict) -> _Cursor:
+        self.operations += 1
+        return _Cursor(self._find(query))
+
+    async def find_one_and_update(self, query: dict, update: dict, upsert: bool = False, return_document=None):
+        self.operations += 1
+        found = self._find(query)
+        if found:
+            document = found[0]
+            self._apply(document, update)
+        elif upsert:
+            document = self._insert(query, copy.deepcopy(update.get("$setOnInsert", {})))
+            self._apply(document, update)
+        else:
+            return None
+        return copy.deepcopy(document)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        self.operations += 1
+        found = self._find(query)
+        if found:
+            self._apply(found[0], update)
+        elif upsert:
+            self._apply(self._insert(query, copy.deepcopy(update.get("$setOnInsert", {}))), update)
+        return _Result(matched_count=len(found[:1]))
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        self.operations += 1
+        found = self._find(query)
+        if found:
+            found[0].clear()
+            found[0].update(copy.deepcopy(replacement))
+        elif upsert:
+            self._insert(query, copy.deepcopy(replacement))
+        return _Result(matched_count=len(found[:1]))
+
+    async def delete_one(self, query: dict):
+        self.operations += 1
+        found = self._find(query)
+        if found:
+            self.documents.remove(found[0])
+        return _Result(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query: dict):
+        self.operations += 1
+        found = self._find(query)
+        self.documents = [document for document in self.documents if document not in found]
+        return _Result(deleted_count=len(found))
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        self.operations += 1
+        # pymongo's UpdateOne keeps its arguments in private attributes
+        for request in requests:
+            await self.update_one(request._filter, request._doc, upsert=request._upsert)
+        return _Result(bulk_api_result={})
+
+
+# endregion
@@ -0,0 +1,74 @@
+"""A local HTTP server imitating Google Translate's translate_a/single and translate_a/t endpoints
+Translations are the source prefixed with the target language, like the MockProvider"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubTranslateServer"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/translate_a/single":
+            return self._respond(404, None)
+        query = parse_qs(url.query)
+        source, target = query["q"][0], query["tl"][0]
+        self._respond(200, [[[f"[{target}] {source}", source, None, None]], None, self.server.detected_lang])
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/translate_a/t":
+            return self._respond(404, None)
+        query = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length", 0))
+        sources = parse_qs(self.rfile.read(length).decode())["q"]
+        target = query["tl"][0]
+        self._respond(200, [[f"[{target}] {source}", self.server.detected_lang] for source in sources])
+
+    def _respond(self, status: int, body) -> None:
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if status == 200 and random.random() < self.server.error_rate:
+            status, body = 503, None
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_):
+        # Keep the benchmark output clean
+        pass
+
+
+class StubTranslateServer(ThreadingHTTPServer):
+    """Runs on a random localhost port in a background thread, use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0, error_rate: float = 0, detected_lang: str = "es"):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.detected_lang = detected_lang
+        self.requests = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,238 @@
+"""Replay recorded (or generated) message traffic through Bot.on_message and report how the bot keeps up
+
+    python -m tests.load.replay generate trace.gz --rate 500 --duration 10
+    python -m tests.load.replay run trace.gz --speed 2 --latency 0.15 --error-rate 0.01
+
+Record a real trace by setting TRACE_RECORD_PATH in bot/settings.py.
+Discord, mongo and the translation API are replaced with in-process fakes, everything in between is the real bot:
+the filters, the worker pool, the config cache, the rate limiter, the batcher and the send queue"""
+
+import argparse
+import asyncio
+import gzip
+import itertools
+import os
+import random
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, project_root)
+
+from tests.benchmarks.fakes import FakeChannel, FakeGuild, FakeMember, FakeMessage, InMemoryCollection
+
+from bot import settings
+from bot.main import Bot
+from bot.send_queue import SendQueue
+from bot.trace import TRACE_HEADER, TraceEvent, format_event, read_trace
+from db import config_manager
+from TranslationAPI import translate as translate_module
+from TranslationAPI.batcher import TranslationBatcher
+from TranslationAPI.cache import translation_cache
+from TranslationAPI.providers import MockProvider, ProviderChain
+from TranslationAPI.ratelimit import TranslationScheduler
+
+# Words messages are built from, so local language detection sees realistic text
+_WORDS = {
+    "en": "the and you that this have with what just like know think going really".split(),
+    "es": "que los las por para como pero muy esta todo gracias bueno donde".split(),
+    "fr": "les des est pas que pour avec une mais tout bien vous merci".split(),
+    "de": "der die das und ist nicht ich mit sie auch noch aber danke".split(),
+    "pt": "que não uma para com mas você isso muito obrigado tudo está".split(),
+    "pl": "nie jest się jak tak ale dla już tylko może dzięki czy".split(),
+    "": "lol ok xd gg hmm nice yes".split(),
+}
+
+_BOT_USER = FakeMember("langbot", bot=True)
+
+
+class ReplayBot(Bot):
+    """The real Bot, without a gateway connection"""
+
+    @property
+    def user(self):
+        return _BOT_USER
+
+    async def process_commands(self, message):
+        # Traces never contain commands, and commands need a real connection state
+        return
+
+
+class RecordingSendQueue(SendQueue):
+    """The real send queue, which also keeps every message's latency from on_message to its translation being sent"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.latencies: list[float] = []
+
+    async def _send(self, batch):
+        await super()._send(batch)
+        now = time.monotonic()
+        self.latencies.extend(now - pending.received_at for pending in batch)
+
+
+def generate(path: str, rate: float, duration: float, guilds: int, channels: int, seed: int) -> None:
+    """Write a synthetic trace with Poisson arrivals, a few busy guilds and a long tail of quiet ones"""
+    rng = random.Random(seed)
+    langs = list(_WORDS)
+    weights = [5, 3, 1, 1, 1, 1, 2]
+    offset = 0.0
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write(TRACE_HEADER + "\n")
+        while True:
+            offset += rng.expovariate(rate)
+            if offset > duration:
+                break
+            # Zipf-like, guild 0 is the busiest
+            guild = min(int(rng.paretovariate(1.2)) - 1, guilds - 1)
+            event = TraceEvent(
+                offset=offset,
+                guild=f"g{guild}",
+                channel=f"g{guild}c{rng.randrange(channels)}",
+                length=max(1, int(rng.lognormvariate(3.3, 0.8))),
+                lang=rng.choices(langs, weights)[0],
+                bot=rng.random() < 0.05,
+            )
+            file.write(format_event(event))
+
+
+def build_text(length: int, lang: str, number: int) -> str:
+    """Make up a message of roughly the given length in the given language
+    The number keeps messages unique, so the translation cache only hits on real repeats"""
+    words = _WORDS.get(lang, _WORDS[""])
+    rng = random.Random(f"{lang}{length}")
+    parts = []
+    while sum(len(part) + 1 for part in parts) < length:
+        parts.append(rng.choice(words))
+    parts.insert(len(parts) // 2, str(number))
+    return " ".join(parts)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def setup(args) -> tuple[ReplayBot, MockProvider]:
+    # Configs live in memory
+    config_manager.config_collection = InMemoryCollection("config")
+    config_manager.channel_config_collection = InMemoryCollection("channel_config")
+    config_manager.invalidate_config_cache()
+
+    # Translations go to the mock provider, through a real provider chain and batcher
+    provider = MockProvider(latency=args.latency, error_rate=args.error_rate)
+    translate_module.providers = ProviderChain(
+        [provider],
+        timeout=settings.TRANSLATE_TIMEOUT,
+        retries=settings.TRANSLATE_RETRIES,
+        backoff_base=settings.TRANSLATE_BACKOFF_BASE,
+        backoff_max=settings.TRANSLATE_BACKOFF_MAX,
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+    )
+    translate_module.batcher = TranslationBatcher(
+        translate_module.providers.translate_many,
+        max_size=settings.TRANSLATE_BATCH_SIZE,
+        max_wait=settings.TRANSLATE_BATCH_WAIT,
+        max_chars=settings.TRANSLATE_BATCH_MAX_CHARS,
+    )
+    if args.no_rate_limit:
+        translate_module.scheduler = TranslationScheduler(1e9, 1e9, 1e9, 1e9)
+
+    bot = ReplayBot()
+    bot.send_queue = RecordingSendQueue(
+        settings.SEND_COALESCE_WINDOW, settings.SEND_CHANNEL_RATE, settings.SEND_CHANNEL_PER
+    )
+    return bot, provider
+
+
+async def replay(args) -> None:
+    bot, provider = setup(args)
+    bot.workers.start()
+
+    guilds: dict[str, FakeGuild] = {}
+    channels: dict[str, FakeChannel] = {}
+    users = FakeMember("user")
+    bots = FakeMember("otherbot", bot=True)
+    numbers = itertools.count()
+
+    events = list(read_trace(args.trace))
+    started = time.perf_counter()
+    for event in events:
+        # Sleep until the event is due, at the replay speed
+        delay = event.offset / args.speed - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        guild = guilds.get(event.guild)
+        if guild is None:
+            guild = guilds[event.guild] = FakeGuild()
+        channel = channels.get(event.channel)
+        if channel is None:
+            channel = channels[event.channel] = FakeChannel(guild)
+
+        message = FakeMessage(
+            build_text(event.length, event.lang, next(numbers)), author=bots if event.bot else users, channel=channel
+        )
+        await bot.on_message(message)
+    offered_for = time.perf_counter() - started
+
+    # Let everything queued finish
+    deadline = time.perf_counter() + args.drain_timeout
+    while time.perf_counter() < deadline and (
+        bot.workers.depth() or bot.workers.busy or bot.workers.parked or bot.send_queue.depth()
+    ):
+        await asyncio.sleep(0.05)
+    finished_for = time.perf_counter() - started
+    await bot.workers.stop()
+    await translate_module.batcher.close()
+
+    latencies = bot.send_queue.latencies
+    print(f"Messages            {len(events)} in {offered_for:.2f}s, {len(events) / max(offered_for, 1e-9):,.0f}/s offered")
+    print(f"Throughput          {len(events) / finished_for:,.0f} messages/s handled, {len(latencies) / finished_for:,.0f} translations/s sent")
+    print(f"Translations sent   {len(latencies)} in {bot.send_queue.sent} Discord messages")
+    print(
+        f"End-to-end latency  p50 {percentile(latencies, 50) * 1000:.0f}ms"
+        f"  p95 {percentile(latencies, 95) * 1000:.0f}ms  p99 {percentile(latencies, 99) * 1000:.0f}ms"
+    )
+    print(f"Upstream calls      {provider.calls}")
+    print(f"Providers           {translate_module.providers.health()}")
+    print(f"Rate limiter        {translate_module.scheduler.stats()}")
+    print(f"Batcher             {translate_module.batcher.stats()}")
+    print(f"Translation cache   {translation_cache.stats()}")
+    print(f"Message filter      {bot.message_filter.stats()}")
+    print(f"Workers             {bot.workers.stats()}")
+    print(f"Send queue          {bot.send_queue.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Write a synthetic trace")
+    gen.add_argument("trace")
+    gen.add_argument("--rate", type=float, default=50, help="Messages per second")
+    gen.add_argument("--duration", type=float, default=10, help="Seconds of traffic")
+    gen.add_argument("--guilds", type=int, default=1000)
+    gen.add_argument("--channels", type=int, default=5, help="Channels per guild")
+    gen.add_argument("--seed", type=int, default=0)
+
+    run = commands.add_parser("run", help="Replay a trace through the bot")
+    run.add_argument("trace")
+    run.add_argument("--speed", type=float, default=1, help="Replay N times faster than recorded")
+    run.add_argument("--latency", type=float, default=0.1, help="Seconds every upstream call takes")
+    run.add_argument("--error-rate", type=float, default=0, help="Share of upstream calls that fail")
+    run.add_argument("--no-rate-limit", action="store_true", help="Lift the upstream translation budget")
+    run.add_argument("--drain-timeout", type=float, default=30, help="Seconds to wait for queued work at the end")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.trace, args.rate, args.duration, args.guilds, args.channels, args.seed)
+    else:
+        asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from TranslationAPI.detect import detect_language
+
+
+def test_russian_without_unique_letters():
+    assert detect_language("Привет, как дела у тебя сегодня") == "ru"
+
+
+def test_russian_with_capitals():
+    assert detect_language("Мы были в этом городе в прошлом году") == "ru"
+
+
+def test_mongolian_is_not_russian():
+    assert detect_language("Сайн байна уу, та хэдэн настай вэ") is None
+    assert detect_language("Өнөөдөр цаг агаар ямар байна вэ") is None
+
+
+def test_kyrgyz_is_not_russian():
+    assert detect_language("Сиз кандайсыз, бүгүн аба ырайы жакшы") is None
+
+
+def test_tatar_is_not_russian():
+    assert detect_language("Сез ничек яшисез, мин бүген өйдә") is None
+
+
+def test_kazakh_is_not_russian():
+    assert detect_language("Сәлеметсіз бе, қалыңыз қалай") is None
+
+
+def test_ukrainian_is_not_russian():
+    assert detect_language("Привіт, як справи у тебе сьогодні") is None
@@ -0,0 +1,135 @@
+from collections import Counter
+from functools import lru_cache
+import re
+
+import discord
+
+from TranslationAPI.detect import detect_language
+
+# Everything in a message that never needs translating
+_UNTRANSLATABLE = re.compile(
+    r"```.*?```"  # Code blocks
+    r"|`[^`]*`"  # Inline code
+    r"|https?://\S+"  # Links
+    r"|<a?:\w+:\d+>"  # Custom emojis
+    r"|<(?:@[!&]?|#)\d+>"  # User, role and channel mentions
+    r"|<t:\d+(?::\w)?>"  # Timestamps
+    r"|:\w+:",  # Emoji shortcodes
+    re.DOTALL,
+)
+
+
+@lru_cache(maxsize=1024)
+def _compile_terms(terms: tuple) -> frozenset:
+    """Turn a guild's ignored terms into a set once, instead of looping them every message"""
+    return frozenset(term.strip().lower() for term in terms)
+
+
+def is_ignored_term(text: str, config: dict) -> bool:
+    """Returns true if the text is equal to one of the config's ignored terms"""
+    return text.strip().lower() in _compile_terms(tuple(config.get("IGNORED_TERMS", ())))
+
+
+def has_translatable_text(content: str) -> bool:
+    """Returns true if the message has any letters left once code, links, emojis and mentions are removed"""
+    if not content:
+        return False
+    stripped = _UNTRANSLATABLE.sub("", content)
+    return any(char.isalpha() for char in stripped)
+
+
+class MessageFilter:
+    """An ordered pipeline of cheap checks that decide if a message should be translated
+
+    Stages run from cheapest to most expensive, the first stage that drops a message stops the pipeline.
+    Every drop is counted per stage, so we can see what traffic never reaches the translation API"""
+
+    def __init__(self, command_prefix: str):
+        self.command_prefix = command_prefix
+        self.counters: Counter[str] = Counter()
+
+        # Stages that don't need the config, run before the config lookup
+        self.pre_stages = [
+            ("no_guild", self._no_guild),
+            ("own_message", self._own_message),
+            ("command", self._command),
+            ("nothing_translatable", self._nothing_translatable),
+        ]
+        # Stages that need the channel config
+        self.config_stages = [
+            ("auto_translate_off", self._auto_translate_off),
+            ("bot_author", self._bot_author),
+            ("blacklisted_role", self._blacklisted_role),
+            ("ignored_term", self._ignored_term),
+            # The most expensive check, local language detection
+            ("ignored_language", self._ignored_language),
+        ]
+
+    def pre_check(self, message: discord.Message, bot_user_id: int) -> str | None:
+        """Run the config-free stages, returns the name of the stage that dropped the message, otherwise None"""
+        return self._run(self.pre_stages, message, bot_user_id)
+
+    def config_check(self, message: discord.Message, config: dict) -> str | None:
+        """Run the config stages, returns the name of the stage that dropped the message, otherwise None"""
+        dropped = self._run(self.config_stages, message, config)
+        if dropped is None:
+            self.counters["passed"] += 1
+        return dropped
+
+    def stats(self) -> dict:
+        return dict(self.counters)
+
+    def _run(self, stages: list, message: discord.Message, context) -> str | None:
+        for name, stage in stages:
+            if stage(message, context):
+                self.counters[name] += 1
+                return name
+        return None
+
+    # region Stages
+
+    @staticmethod
+    def _no_guild(message: discord.Message, _) -> bool:
+        return message.guild is None
+
+    @staticmethod
+    def _own_message(message: discord.Message, bot_user_id: int) -> bool:
+        return message.author.id == bot_user_id
+
+    def _command(self, message: discord.Message, _) -> bool:
+        return message.content.startswith(self.command_prefix)
+
+    @staticmethod
+    def _nothing_translatable(message: discord.Message, _) -> bool:
+        return not has_translatable_text(message.content)
+
+    @staticmethod
+    def _auto_translate_off(message: discord.Message, config: dict) -> bool:
+        return not config.get("AUTO_TRANSLATE", True)
+
+    @staticmethod
+    def _bot_author(message: discord.Message, config: dict) -> bool:
+        return message.author.bot and config.get("IGNORE_BOTS", True)
+
+    @staticmethod
+    def _blacklisted_role(message: discord.Message, config: dict) -> bool:
+        blacklisted = config.get("BLACKLISTED_ROLES")
+        if not blacklisted:
+            return False
+        # Webhook messages have a User, not a Member, so they have no roles
+        roles = getattr(message.author, "roles", ())
+        return any(role.id in blacklisted for role in roles)
+
+    @staticmethod
+    def _ignored_term(message: discord.Message, config: dict) -> bool:
+        return is_ignored_term(message.content, config)
+
+    @staticmethod
+    def _ignored_language(message: discord.Message, config: dict) -> bool:
+        # Skip the translation API when the message is confidently in a language we wouldn't translate
+        detected = detect_language(message.content)
+        if detected is None:
+            return False
+        return detected in config.get("IGNORE_LANGS", ()) or detected == config.get("TARGET_LANG")
+
+    # endregion
@@ -0,0 +1,104 @@
+from functools import lru_cache
+from string import Formatter
+
+import discord
+
+from i_logger.logger import log
+from TranslationAPI import languages
+
+
+class InvalidTemplate(ValueError):
+    """Raised when a translation reply message can't be used as a template"""
+
+
+# What author_avatar can be at send time, members without an avatar have None
+_SAMPLE_AVATARS = (None, discord.Asset(None, url="/avatars/0/0.png", key="0"))  # type: ignore
+
+# Every placeholder a reply message can use
+# name -> (function that gets the value from (translated, message, detected_lang),
+#          sample values of every type it can have at send time, used for validation)
+PLACEHOLDERS = {
+    "flag": (lambda t, m, d: languages.flag(d), ("🌍",)),
+    "translated": (lambda t, m, d: t, ("translated",)),
+    "original": (lambda t, m, d: m.content, ("original",)),
+    "author_id": (lambda t, m, d: m.author.id, (0,)),
+    "author_display_name": (lambda t, m, d: m.author.display_name, ("name",)),
+    "author_username": (lambda t, m, d: m.author.name, ("name",)),
+    "author_mention": (lambda t, m, d: m.author.mention, ("<@0>",)),
+    "author_avatar": (lambda t, m, d: m.author.avatar, _SAMPLE_AVATARS),
+    "guild_id": (lambda t, m, d: m.guild.id, (0,)),
+    "guild_name": (lambda t, m, d: m.guild.name, ("guild",)),
+    "channel_id": (lambda t, m, d: m.channel.id, (0,)),
+    "channel_name": (lambda t, m, d: m.channel.name, ("channel",)),
+    "message_id": (lambda t, m, d: m.id, (0,)),
+    "message_url": (lambda t, m, d: m.jump_url, ("url",)),
+    "lang_code": (lambda t, m, d: d, ("en",)),
+    "lang_name": (lambda t, m, d: languages.display_name(d), ("English",)),
+}
+
+_CONVERSIONS = {None: lambda value: value, "s": str, "r": repr, "a": ascii}
+
+
+class CompiledTemplate:
+    """A parsed reply message that only evaluates the placeholders it uses"""
+
+    def __init__(self, template: str):
+        self.template = template
+        # Literal text and (getter, conversion, format spec) parts, in order
+        self.parts: list = []
+        self.fields: set[str] = set()
+
+        try:
+            parsed = list(Formatter().parse(template))
+        except ValueError as e:
+            raise InvalidTemplate(f"Unbalanced braces: {e}") from None
+
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                self.parts.append(literal)
+            if field is None:
+                continue
+            if field not in PLACEHOLDERS:
+                raise InvalidTemplate(f"Unknown placeholder {{{field}}}")
+            if conversion not in _CONVERSIONS:
+                raise InvalidTemplate(f"Unknown conversion !{conversion} in {{{field}}}")
+            if spec and ("{" in spec or "}" in spec):
+                raise InvalidTemplate(f"Nested placeholders are not allowed in {{{field}}}")
+
+            self.fields.add(field)
+            self.parts.append((PLACEHOLDERS[field][0], _CONVERSIONS[conversion], spec or ""))
+
+            # Make sure the format spec works for every type this placeholder can have now, instead of at send time
+            for sample in PLACEHOLDERS[field][1]:
+                try:
+                    format(_CONVERSIONS[conversion](sample), spec or "")
+                except (ValueError, TypeError) as e:
+                    raise InvalidTemplate(f"Invalid format for {{{field}}}: {e}") from None
+
+    def render(self, translated_text: str, message: discord.Message, detected_lang: str) -> str:
+        result = []
+        for part in self.parts:
+            if isinstance(part, str):
+                result.append(part)
+            else:
+                getter, conversion, spec = part
+                result.append(format(conversion(getter(translated_text, message, detected_lang)), spec))
+        return "".join(result)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template: str) -> CompiledTemplate:
+    """Parse a reply message once, raises InvalidTemplate if it can't be used"""
+    return CompiledTemplate(template)
+
+
+@lru_cache(maxsize=1024)
+def compile_reply(template: str, fallback: str) -> CompiledTemplate:
+    """compile_template for a stored reply message, falling back to another template if it is invalid
+    Cached either way, so an invalid reply message is only parsed and logged once"""
+    try:
+        return compile_template(template)
+    except InvalidTemplate as e:
+        # Stored before templates were validated
+        log(f"Invalid translation reply message {template!r}, using {fallback!r} instead: {e}", "critical")
+        return compile_template(fallback)